@@ -0,0 +1,35 @@
+"""partial gist index for searchable donors
+
+Revision ID: 20261017_01_donor_search_index
+Revises: 20260228_01_trust_layer
+Create Date: 2026-10-17 00:00:00
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261017_01_donor_search_index"
+down_revision = "20260228_01_trust_layer"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # btree_gist lets donation_type share one GiST index with location.
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_searchable_donor_location
+            ON users USING GIST (donation_type, location)
+            WHERE role = 'donor'
+              AND available = TRUE
+              AND is_verified_donor = TRUE
+              AND verification_status = 'approved'
+            """
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_searchable_donor_location")
@@ -0,0 +1,29 @@
+"""composite index for keyset chat history
+
+Revision ID: 20261017_02_message_history_index
+Revises: 20261017_01_donor_search_index
+Create Date: 2026-10-17 00:00:00
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261017_02_message_history_index"
+down_revision = "20261017_01_donor_search_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_pair_created_at
+            ON messages (sender_id, receiver_id, created_at, id)
+            """
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_messages_pair_created_at")
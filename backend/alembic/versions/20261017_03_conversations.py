@@ -0,0 +1,79 @@
+"""conversations inbox read model
+
+Revision ID: 20261017_03_conversations
+Revises: 20261017_02_message_history_index
+Create Date: 2026-10-17 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261017_03_conversations"
+down_revision = "20261017_02_message_history_index"
+branch_labels = None
+depends_on = None
+
+
+BACKFILL_CONVERSATIONS_SQL = """
+INSERT INTO conversations
+    (user_id, other_user_id, last_message_id, last_message, last_sender_id,
+     last_message_at, unread_count)
+SELECT
+    latest.user_id,
+    latest.other_user_id,
+    latest.id,
+    latest.content,
+    latest.sender_id,
+    latest.created_at,
+    coalesce(unread.unread_count, 0)
+FROM (
+    SELECT DISTINCT ON (side.user_id, side.other_user_id)
+        side.user_id,
+        side.other_user_id,
+        m.id,
+        m.content,
+        m.sender_id,
+        m.created_at
+    FROM messages m
+    CROSS JOIN LATERAL (
+        VALUES (m.sender_id, m.receiver_id), (m.receiver_id, m.sender_id)
+    ) AS side(user_id, other_user_id)
+    ORDER BY side.user_id, side.other_user_id, m.created_at DESC, m.id DESC
+) AS latest
+LEFT JOIN (
+    -- Counted once per pair, not once per message row.
+    SELECT receiver_id AS user_id, sender_id AS other_user_id, count(*) AS unread_count
+    FROM messages
+    WHERE is_read = FALSE
+    GROUP BY 1, 2
+) AS unread
+    ON unread.user_id = latest.user_id
+   AND unread.other_user_id = latest.other_user_id
+ON CONFLICT (user_id, other_user_id) DO NOTHING
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "conversations",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("other_user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, nullable=False),
+        sa.Column("last_message_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("messages.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("last_message", sa.Text(), nullable=False),
+        sa.Column("last_sender_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("last_message_at", sa.DateTime(), nullable=False),
+        sa.Column("unread_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index(
+        "ix_conversations_user_last_message_at",
+        "conversations",
+        ["user_id", "last_message_at", "other_user_id"],
+    )
+    op.execute(BACKFILL_CONVERSATIONS_SQL)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversations_user_last_message_at", table_name="conversations")
+    op.drop_table("conversations")
@@ -0,0 +1,95 @@
+"""partition audit_logs by month
+
+Revision ID: 20261017_04_audit_log_partitions
+Revises: 20261017_03_conversations
+Create Date: 2026-10-17 00:00:00
+"""
+
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_04_audit_log_partitions"
+down_revision = "20261017_03_conversations"
+branch_labels = None
+depends_on = None
+
+# Partitions created past the current month; the app keeps extending this.
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partitions(since: date) -> None:
+    month = date(since.year, since.month, 1)
+    now = datetime.utcnow()
+    last = _add_months(date(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE audit_logs_y{month.year:04d}m{month.month:02d} "
+            f"PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+
+
+def upgrade() -> None:
+    op.drop_index("ix_audit_logs_timestamp", table_name="audit_logs")
+    op.drop_index("ix_audit_logs_action_type", table_name="audit_logs")
+    op.drop_index("ix_audit_logs_user_id", table_name="audit_logs")
+    op.rename_table("audit_logs", "audit_logs_legacy")
+    op.execute("ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey")
+
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            id uuid NOT NULL,
+            user_id uuid NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            action_type varchar NOT NULL,
+            metadata_json json NOT NULL DEFAULT '{}'::json,
+            timestamp timestamp NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """
+    )
+    op.create_index("ix_audit_logs_timestamp_id", "audit_logs", ["timestamp", "id"])
+    op.create_index("ix_audit_logs_user_timestamp", "audit_logs", ["user_id", "timestamp", "id"])
+    op.create_index("ix_audit_logs_action_timestamp", "audit_logs", ["action_type", "timestamp", "id"])
+
+    oldest = op.get_bind().execute(sa.text("SELECT min(timestamp) FROM audit_logs_legacy")).scalar()
+    _create_partitions(oldest or datetime.utcnow())
+
+    op.execute(
+        "INSERT INTO audit_logs (id, user_id, action_type, metadata_json, timestamp) "
+        "SELECT id, user_id, action_type, metadata_json, timestamp FROM audit_logs_legacy"
+    )
+    op.drop_table("audit_logs_legacy")
+
+
+def downgrade() -> None:
+    op.rename_table("audit_logs", "audit_logs_partitioned")
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            id uuid PRIMARY KEY,
+            user_id uuid NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            action_type varchar NOT NULL,
+            metadata_json json NOT NULL DEFAULT '{}'::json,
+            timestamp timestamp NOT NULL DEFAULT now()
+        )
+        """
+    )
+    op.execute(
+        "INSERT INTO audit_logs (id, user_id, action_type, metadata_json, timestamp) "
+        "SELECT id, user_id, action_type, metadata_json, timestamp FROM audit_logs_partitioned"
+    )
+    # Dropping the parent drops every partition with it.
+    op.drop_table("audit_logs_partitioned")
+    op.create_index("ix_audit_logs_user_id", "audit_logs", ["user_id"])
+    op.create_index("ix_audit_logs_action_type", "audit_logs", ["action_type"])
+    op.create_index("ix_audit_logs_timestamp", "audit_logs", ["timestamp"])
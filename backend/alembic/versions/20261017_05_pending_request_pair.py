@@ -0,0 +1,44 @@
+"""unique pending request per donor/seeker pair
+
+Revision ID: 20261017_05_pending_request_pair
+Revises: 20261017_04_audit_log_partitions
+Create Date: 2026-10-17 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_05_pending_request_pair"
+down_revision = "20261017_04_audit_log_partitions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep the oldest pending request per pair; later duplicates are rejected.
+    op.execute(
+        """
+        UPDATE donation_requests dup
+        SET status = 'rejected'
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY donor_id, seeker_id ORDER BY created_at, id
+            ) AS position
+            FROM donation_requests
+            WHERE status = 'pending'
+        ) ranked
+        WHERE dup.id = ranked.id AND ranked.position > 1
+        """
+    )
+    op.create_index(
+        "uq_donation_requests_pending_pair",
+        "donation_requests",
+        ["donor_id", "seeker_id"],
+        unique=True,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_donation_requests_pending_pair", table_name="donation_requests")
@@ -0,0 +1,39 @@
+"""stored integer priority for donation requests
+
+Revision ID: 20261017_06_request_priority
+Revises: 20261017_05_pending_request_pair
+Create Date: 2026-10-17 00:00:00
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261017_06_request_priority"
+down_revision = "20261017_05_pending_request_pair"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE donation_requests ADD COLUMN priority INTEGER "
+        "GENERATED ALWAYS AS ("
+        "CASE urgency WHEN 'critical' THEN 4 WHEN 'high' THEN 3 WHEN 'medium' THEN 2 ELSE 1 END"
+        ") STORED NOT NULL"
+    )
+    op.create_index(
+        "ix_donation_requests_donor_priority",
+        "donation_requests",
+        ["donor_id", "priority", "created_at", "id"],
+    )
+    op.create_index(
+        "ix_donation_requests_seeker_priority",
+        "donation_requests",
+        ["seeker_id", "priority", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_donation_requests_seeker_priority", table_name="donation_requests")
+    op.drop_index("ix_donation_requests_donor_priority", table_name="donation_requests")
+    op.drop_column("donation_requests", "priority")
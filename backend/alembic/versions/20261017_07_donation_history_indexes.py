@@ -0,0 +1,32 @@
+"""donation history keyset indexes
+
+Revision ID: 20261017_07_donation_history_indexes
+Revises: 20261017_06_request_priority
+Create Date: 2026-10-17 00:00:00
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261017_07_donation_history_indexes"
+down_revision = "20261017_06_request_priority"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_donation_requests_donor_created_at",
+        "donation_requests",
+        ["donor_id", "created_at", "id"],
+    )
+    op.create_index(
+        "ix_donation_requests_seeker_created_at",
+        "donation_requests",
+        ["seeker_id", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_donation_requests_seeker_created_at", table_name="donation_requests")
+    op.drop_index("ix_donation_requests_donor_created_at", table_name="donation_requests")
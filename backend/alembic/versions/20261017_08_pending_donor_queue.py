@@ -0,0 +1,34 @@
+"""users.created_at and pending donor review queue index
+
+Revision ID: 20261017_08_pending_donor_queue
+Revises: 20261017_07_donation_history_indexes
+Create Date: 2026-10-17 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_08_pending_donor_queue"
+down_revision = "20261017_07_donation_history_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing users get the migration time; ties fall back to id order.
+    op.add_column(
+        "users",
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+    )
+    op.create_index(
+        "ix_users_pending_donors",
+        "users",
+        ["created_at", "id"],
+        postgresql_where=sa.text("role = 'donor' AND verification_status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_pending_donors", table_name="users")
+    op.drop_column("users", "created_at")
@@ -5,9 +5,12 @@ from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from .database import get_async_db
 from . import models
+from .services.cache import TTLCache
 
 load_dotenv()
 
@@ -15,6 +18,8 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
 EMAIL_VERIFY_TOKEN_EXPIRE_HOURS = int(os.getenv("EMAIL_VERIFY_TOKEN_EXPIRE_HOURS", 24))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", 10000))
 
 
 def _parse_bool(value: str | None, default: bool = False) -> bool:
@@ -33,6 +38,32 @@ if not SECRET_KEY:
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Column values of recently authenticated users, keyed by user id. The cache
+# is per process, so the TTL bounds how stale another worker's copy can get.
+principal_cache = TTLCache(
+    maxsize=PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+_USER_COLUMNS = tuple(attr.key for attr in inspect(models.User).column_attrs)
+
+
+def invalidate_principal(user_id: uuid.UUID) -> None:
+    principal_cache.pop(user_id)
+
+
+def _cache_principal(user: models.User) -> None:
+    principal_cache.set(user.id, {key: getattr(user, key) for key in _USER_COLUMNS})
+
+
+def _restore_principal(db: AsyncSession, values: dict) -> models.User:
+    # Rebuild a persistent User from cached column values so handlers can
+    # still modify and commit it without the SELECT.
+    user = models.User(**values)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -63,9 +94,9 @@ def decode_email_verification_token(token: str) -> dict:
     return payload
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -73,15 +104,20 @@ def get_current_user(
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return _restore_principal(db, cached)
+
+    user = await db.get(models.User, user_id)
 
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
+    _cache_principal(user)
     return user
 
 
-def get_current_admin(
+async def get_current_admin(
     current_user: models.User = Depends(get_current_user),
 ):
     if current_user.role != "admin":
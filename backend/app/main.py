@@ -1,9 +1,16 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 
-from .database import engine
+from .database import async_engine, engine
 from . import models
+from .services import audit_partitions
+from .services.audit import audit_sink
+from .services.conversations import BACKFILL_CONVERSATIONS_SQL
+from .services.passwords import password_hasher
 from .routes import users, donors, requests, chat, verification, admin, moderation
 
 
@@ -13,6 +20,22 @@ from .routes import users, donors, requests, chat, verification, admin, moderati
 models.Base.metadata.create_all(bind=engine)
 
 
+# Keeps the oldest pending request per donor/seeker pair; later duplicates
+# are marked rejected.
+DEDUPE_PENDING_REQUESTS_SQL = """
+UPDATE donation_requests dup
+SET status = 'rejected'
+FROM (
+    SELECT id, row_number() OVER (
+        PARTITION BY donor_id, seeker_id ORDER BY created_at, id
+    ) AS position
+    FROM donation_requests
+    WHERE status = 'pending'
+) ranked
+WHERE dup.id = ranked.id AND ranked.position > 1
+"""
+
+
 def _run_startup_migrations() -> None:
     # Keep existing databases compatible after adding trust-layer columns.
     with engine.begin() as conn:
@@ -49,6 +72,82 @@ def _run_startup_migrations() -> None:
         conn.execute(
             text("CREATE INDEX IF NOT EXISTS idx_users_location ON users USING GIST (location)")
         )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_messages_pair_created_at "
+                "ON messages (sender_id, receiver_id, created_at, id)"
+            )
+        )
+        # Fill the inbox read model once for databases that predate it.
+        has_conversations = conn.execute(
+            text("SELECT EXISTS (SELECT 1 FROM conversations)")
+        ).scalar()
+        if not has_conversations:
+            conn.execute(text(BACKFILL_CONVERSATIONS_SQL))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS idx_users_searchable_donor_location "
+                "ON users USING GIST (donation_type, location) "
+                "WHERE role = 'donor' AND available = TRUE "
+                "AND is_verified_donor = TRUE AND verification_status = 'approved'"
+            )
+        )
+        # Collapse duplicate pending requests once, before enforcing
+        # uniqueness; with the index in place there can be none.
+        has_pending_pair_index = conn.execute(
+            text("SELECT to_regclass('uq_donation_requests_pending_pair') IS NOT NULL")
+        ).scalar()
+        if not has_pending_pair_index:
+            conn.execute(text(DEDUPE_PENDING_REQUESTS_SQL))
+            conn.execute(
+                text(
+                    "CREATE UNIQUE INDEX uq_donation_requests_pending_pair "
+                    "ON donation_requests (donor_id, seeker_id) WHERE status = 'pending'"
+                )
+            )
+        conn.execute(
+            text(
+                "ALTER TABLE donation_requests ADD COLUMN IF NOT EXISTS priority INTEGER "
+                f"GENERATED ALWAYS AS ({models.DONATION_REQUEST_PRIORITY_SQL}) STORED NOT NULL"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_donation_requests_donor_priority "
+                "ON donation_requests (donor_id, priority, created_at, id)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_donation_requests_seeker_priority "
+                "ON donation_requests (seeker_id, priority, created_at, id)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_donation_requests_donor_created_at "
+                "ON donation_requests (donor_id, created_at, id)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_donation_requests_seeker_created_at "
+                "ON donation_requests (seeker_id, created_at, id)"
+            )
+        )
+        conn.execute(
+            text("ALTER TABLE users ADD COLUMN IF NOT EXISTS created_at TIMESTAMP NOT NULL DEFAULT now()")
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_users_pending_donors ON users (created_at, id) "
+                "WHERE role = 'donor' AND verification_status = 'pending'"
+            )
+        )
+        # Older databases have a plain audit_logs table; partition it by month.
+        audit_partitions.convert_to_partitioned(conn)
+        audit_partitions.run_maintenance(conn)
 
 
 _run_startup_migrations()
@@ -57,7 +156,25 @@ _run_startup_migrations()
 # ==============================
 # APP INIT
 # ==============================
-app = FastAPI(title="Organ Donor API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await audit_sink.start()
+    maintenance = asyncio.create_task(audit_partitions.maintenance_loop(async_engine))
+    await chat.chat_manager.start()
+    if chat.message_writer is not None:
+        await chat.message_writer.start()
+    try:
+        yield
+    finally:
+        if chat.message_writer is not None:
+            await chat.message_writer.stop()
+        await chat.chat_manager.stop()
+        await audit_sink.stop()
+        maintenance.cancel()
+        password_hasher.shutdown()
+
+
+app = FastAPI(title="Organ Donor API", version="1.0.0", lifespan=lifespan)
 
 
 # ==============================
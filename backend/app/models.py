@@ -3,6 +3,7 @@ from datetime import datetime
 
 from sqlalchemy import (
     Column,
+    Computed,
     String,
     Boolean,
     ForeignKey,
@@ -10,8 +11,11 @@ from sqlalchemy import (
     Text,
     Integer,
     JSON,
+    Index,
     UniqueConstraint,
     event,
+    func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -22,6 +26,15 @@ from .database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Admin review queue, oldest registration first.
+        Index(
+            "ix_users_pending_donors",
+            "created_at",
+            "id",
+            postgresql_where=text("role = 'donor' AND verification_status = 'pending'"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
@@ -38,6 +51,7 @@ class User(Base):
     verification_status = Column(String, default="pending", nullable=False)
     available = Column(Boolean, default=True)
     location = Column(Geography(geometry_type="POINT", srid=4326))
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
 
     sent_requests = relationship("DonationRequest", foreign_keys="DonationRequest.seeker_id", back_populates="seeker", cascade="all, delete")
     received_requests = relationship("DonationRequest", foreign_keys="DonationRequest.donor_id", back_populates="donor", cascade="all, delete")
@@ -51,14 +65,37 @@ class User(Base):
     audit_logs = relationship("AuditLog", back_populates="user", cascade="all, delete")
 
 
+DONATION_REQUEST_PRIORITY_SQL = (
+    "CASE urgency WHEN 'critical' THEN 4 WHEN 'high' THEN 3 WHEN 'medium' THEN 2 ELSE 1 END"
+)
+
+
 class DonationRequest(Base):
     __tablename__ = "donation_requests"
+    __table_args__ = (
+        # At most one pending request per donor/seeker pair.
+        Index(
+            "uq_donation_requests_pending_pair",
+            "donor_id",
+            "seeker_id",
+            unique=True,
+            postgresql_where=text("status = 'pending'"),
+        ),
+        # Keyset order for /my-requests, one per side of the request.
+        Index("ix_donation_requests_donor_priority", "donor_id", "priority", "created_at", "id"),
+        Index("ix_donation_requests_seeker_priority", "seeker_id", "priority", "created_at", "id"),
+        # Newest-first keyset order for /donation-history.
+        Index("ix_donation_requests_donor_created_at", "donor_id", "created_at", "id"),
+        Index("ix_donation_requests_seeker_created_at", "seeker_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     donor_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     seeker_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     organ_type = Column(String, nullable=False)
     urgency = Column(String, default="medium")
+    # Sortable urgency: critical 4, high 3, medium 2, anything else 1.
+    priority = Column(Integer, Computed(DONATION_REQUEST_PRIORITY_SQL, persisted=True), nullable=False)
     status = Column(String, default="pending")
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -68,6 +105,9 @@ class DonationRequest(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_pair_created_at", "sender_id", "receiver_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     sender_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -81,6 +121,23 @@ class Message(Base):
     receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages")
 
 
+class Conversation(Base):
+    """Inbox read model: one row per user per chat partner."""
+
+    __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conversations_user_last_message_at", "user_id", "last_message_at", "other_user_id"),
+    )
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    other_user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    last_message_id = Column(UUID(as_uuid=True), ForeignKey("messages.id", ondelete="SET NULL"))
+    last_message = Column(Text, nullable=False)
+    last_sender_id = Column(UUID(as_uuid=True), nullable=False)
+    last_message_at = Column(DateTime, nullable=False)
+    unread_count = Column(Integer, default=0, nullable=False)
+
+
 class OTPVerification(Base):
     __tablename__ = "otp_verifications"
 
@@ -126,13 +183,25 @@ class UserBlock(Base):
 
 
 class AuditLog(Base):
+    """Append-only audit trail, range-partitioned by month on ``timestamp``.
+
+    Partitions are managed by ``app.services.audit_partitions``.
+    """
+
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_user_timestamp", "user_id", "timestamp", "id"),
+        Index("ix_audit_logs_action_timestamp", "action_type", "timestamp", "id"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
+    # The partition key has to be part of the primary key.
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
-    action_type = Column(String, nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    action_type = Column(String, nullable=False)
     metadata_json = Column(JSON, nullable=False, default=dict)
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, primary_key=True)
 
     user = relationship("User", back_populates="audit_logs")
 
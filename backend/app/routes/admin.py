@@ -1,31 +1,81 @@
+import base64
+import os
 import uuid
+from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
 from ..auth import get_current_admin
-from ..database import get_db
-from ..services.audit import log_audit_event
+from ..database import async_engine, engine, get_async_db
+from ..services.audit import audit_sink, log_audit_event
+from ..services.db_metrics import async_pool_metrics, sync_pool_metrics
+from ..services.passwords import password_hasher
+from .chat import chat_manager, invalidate_principals, message_writer
+from .donors import invalidate_nearby_donors, nearby_donors_cache
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+MAX_AUDIT_PAGE_SIZE = 200
+MAX_PENDING_DONORS_PAGE_SIZE = 200
+# Approvals beyond this clear the nearby-donor cache instead of
+# invalidating it donor by donor.
+BULK_DECISION_CACHE_SCAN_LIMIT = 50
+# Window searched when the caller gives no "since"; keeps queries to a few
+# monthly partitions.
+AUDIT_QUERY_DEFAULT_DAYS = int(os.getenv("AUDIT_QUERY_DEFAULT_DAYS", 30))
+
 
 @router.get("/pending-donors")
-def get_pending_donors(
+async def get_pending_donors(
+    limit: int = 50,
+    cursor: uuid.UUID | None = None,
     current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    donors = (
-        db.query(models.User)
-        .filter(
-            models.User.role == "donor",
-            models.User.verification_status == "pending",
+    if not 1 <= limit <= MAX_PENDING_DONORS_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Limit must be between 1 and {MAX_PENDING_DONORS_PAGE_SIZE}",
         )
-        .order_by(models.User.id.asc())
-        .all()
+
+    # Oldest registration first, read in order from ix_users_pending_donors.
+    query = select(
+        models.User.id,
+        models.User.name,
+        models.User.email,
+        models.User.phone,
+        models.User.blood_group,
+        models.User.donation_type,
+        models.User.verification_status,
+        models.User.created_at,
+    ).where(
+        models.User.role == "donor",
+        models.User.verification_status == "pending",
     )
 
+    # The cursor is the id of the last donor on the previous page.
+    if cursor is not None:
+        cursor_created_at = await db.scalar(
+            select(models.User.created_at).where(models.User.id == cursor)
+        )
+        if cursor_created_at is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(
+            tuple_(models.User.created_at, models.User.id) > tuple_(cursor_created_at, cursor)
+        )
+
+    donors = (
+        await db.execute(
+            query.order_by(models.User.created_at.asc(), models.User.id.asc()).limit(limit + 1)
+        )
+    ).all()
+
+    has_more = len(donors) > limit
+    donors = donors[:limit]
+
     items = [
         {
             "id": str(user.id),
@@ -35,6 +85,7 @@ def get_pending_donors(
             "blood_group": user.blood_group,
             "donation_type": user.donation_type,
             "verification_status": user.verification_status,
+            "registered_at": user.created_at.isoformat(),
         }
         for user in donors
     ]
@@ -43,29 +94,100 @@ def get_pending_donors(
         "success": True,
         "message": "Pending donors fetched",
         "data": items,
+        "next_cursor": items[-1]["id"] if has_more else None,
+    }
+
+
+@router.put("/donor-decisions")
+async def decide_pending_donors(
+    payload: schemas.AdminBulkDonorDecisionRequest,
+    current_admin: models.User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db),
+):
+    user_ids = list(dict.fromkeys(payload.user_ids))
+
+    # Only donors still pending are decided, so a stale queue page cannot
+    # overturn a decision another admin already made.
+    decided = (
+        await db.execute(
+            update(models.User)
+            .where(
+                models.User.id.in_(user_ids),
+                models.User.role == "donor",
+                models.User.verification_status == "pending",
+            )
+            .values(
+                is_verified_donor=payload.decision == "approved",
+                verification_status=payload.decision,
+            )
+            .returning(models.User.id, models.User.location, models.User.donation_type)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+
+    if decided:
+        timestamp = datetime.utcnow()
+        await db.execute(
+            insert(models.AuditLog),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": current_admin.id,
+                    "action_type": "donor_approval",
+                    "metadata_json": {
+                        "donor_id": str(row.id),
+                        "decision": payload.decision,
+                        "reason": payload.reason,
+                        "bulk": True,
+                    },
+                    "timestamp": timestamp,
+                }
+                for row in decided
+            ],
+        )
+    await db.commit()
+
+    await invalidate_principals(*(row.id for row in decided))
+
+    # Pending donors were never searchable, so only approvals change
+    # nearby-donor results. Past a handful, dropping the cache is cheaper
+    # than matching every donor against every cached search.
+    if payload.decision == "approved" and decided:
+        if len(decided) > BULK_DECISION_CACHE_SCAN_LIMIT:
+            nearby_donors_cache.clear()
+        else:
+            for row in decided:
+                invalidate_nearby_donors(row.location, row.donation_type)
+
+    updated = {row.id for row in decided}
+    return {
+        "success": True,
+        "message": f"{len(updated)} donor(s) {payload.decision}",
+        "data": {
+            "updated": [str(user_id) for user_id in user_ids if user_id in updated],
+            "skipped": [str(user_id) for user_id in user_ids if user_id not in updated],
+        },
     }
 
 
 @router.put("/approve-donor/{user_id}")
-def approve_donor(
+async def approve_donor(
     user_id: uuid.UUID,
     payload: schemas.AdminDonorDecisionRequest,
     current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    donor = (
-        db.query(models.User)
-        .filter(models.User.id == user_id, models.User.role == "donor")
-        .first()
+    donor = await db.scalar(
+        select(models.User).where(models.User.id == user_id, models.User.role == "donor")
     )
     if not donor:
         raise HTTPException(status_code=404, detail="Donor not found")
 
     donor.is_verified_donor = True
     donor.verification_status = "approved"
-    db.commit()
 
-    log_audit_event(
+    # The decision and its audit row commit together.
+    await log_audit_event(
         db,
         user_id=current_admin.id,
         action_type="donor_approval",
@@ -74,7 +196,10 @@ def approve_donor(
             "decision": "approved",
             "reason": payload.reason,
         },
+        durable=True,
     )
+    await invalidate_principals(donor.id)
+    invalidate_nearby_donors(donor.location, donor.donation_type)
 
     return {
         "success": True,
@@ -88,25 +213,23 @@ def approve_donor(
 
 
 @router.put("/reject-donor/{user_id}")
-def reject_donor(
+async def reject_donor(
     user_id: uuid.UUID,
     payload: schemas.AdminDonorDecisionRequest,
     current_admin: models.User = Depends(get_current_admin),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    donor = (
-        db.query(models.User)
-        .filter(models.User.id == user_id, models.User.role == "donor")
-        .first()
+    donor = await db.scalar(
+        select(models.User).where(models.User.id == user_id, models.User.role == "donor")
     )
     if not donor:
         raise HTTPException(status_code=404, detail="Donor not found")
 
     donor.is_verified_donor = False
     donor.verification_status = "rejected"
-    db.commit()
 
-    log_audit_event(
+    # The decision and its audit row commit together.
+    await log_audit_event(
         db,
         user_id=current_admin.id,
         action_type="donor_approval",
@@ -115,7 +238,10 @@ def reject_donor(
             "decision": "rejected",
             "reason": payload.reason,
         },
+        durable=True,
     )
+    await invalidate_principals(donor.id)
+    invalidate_nearby_donors(donor.location, donor.donation_type)
 
     return {
         "success": True,
@@ -126,3 +252,143 @@ def reject_donor(
             "is_verified_donor": donor.is_verified_donor,
         },
     }
+
+
+@router.get("/db-pool")
+async def get_db_pool_metrics(
+    current_admin: models.User = Depends(get_current_admin),
+):
+    return {
+        "success": True,
+        "message": "Connection pool metrics fetched",
+        "data": {
+            "async": async_pool_metrics.snapshot(async_engine.pool),
+            "sync": sync_pool_metrics.snapshot(engine.pool),
+        },
+    }
+
+
+@router.get("/chat-metrics")
+async def get_chat_metrics(
+    current_admin: models.User = Depends(get_current_admin),
+):
+    return {
+        "success": True,
+        "message": "Chat connection metrics fetched",
+        "data": {
+            **chat_manager.snapshot(),
+            "group_commit": message_writer.metrics if message_writer is not None else None,
+        },
+    }
+
+
+@router.get("/audit-metrics")
+async def get_audit_metrics(
+    current_admin: models.User = Depends(get_current_admin),
+):
+    return {
+        "success": True,
+        "message": "Audit sink metrics fetched",
+        "data": audit_sink.snapshot(),
+    }
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # audit_logs.timestamp is naive UTC.
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _encode_audit_cursor(entry: models.AuditLog) -> str:
+    raw = f"{entry.timestamp.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_audit_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, entry_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), uuid.UUID(entry_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/audit-logs")
+async def get_audit_logs(
+    current_admin: models.User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: uuid.UUID | None = None,
+    action_type: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = 50,
+):
+    if not 1 <= limit <= MAX_AUDIT_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Limit must be between 1 and {MAX_AUDIT_PAGE_SIZE}",
+        )
+
+    until = _naive_utc(until) if until else datetime.utcnow()
+    since = _naive_utc(since) if since else until - timedelta(days=AUDIT_QUERY_DEFAULT_DAYS)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+
+    # Literal bounds on the partition key let Postgres prune partitions
+    # outside the window; newest first on (timestamp, id).
+    query = select(models.AuditLog).where(
+        models.AuditLog.timestamp >= since,
+        models.AuditLog.timestamp < until,
+    )
+    if user_id is not None:
+        query = query.where(models.AuditLog.user_id == user_id)
+    if action_type:
+        query = query.where(models.AuditLog.action_type == action_type.strip())
+    if cursor:
+        cursor_timestamp, cursor_id = _decode_audit_cursor(cursor)
+        query = query.where(
+            models.AuditLog.timestamp <= cursor_timestamp,
+            tuple_(models.AuditLog.timestamp, models.AuditLog.id) < tuple_(cursor_timestamp, cursor_id),
+        )
+
+    entries = (
+        await db.scalars(
+            query
+            .order_by(models.AuditLog.timestamp.desc(), models.AuditLog.id.desc())
+            .limit(limit + 1)
+        )
+    ).all()
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    return {
+        "success": True,
+        "message": "Audit logs fetched",
+        "data": {
+            "items": [
+                {
+                    "id": str(entry.id),
+                    "user_id": str(entry.user_id),
+                    "action_type": entry.action_type,
+                    "metadata": entry.metadata_json,
+                    "timestamp": entry.timestamp.isoformat(),
+                }
+                for entry in entries
+            ],
+            "next_cursor": _encode_audit_cursor(entries[-1]) if has_more else None,
+        },
+    }
+
+
+@router.get("/password-hasher")
+async def get_password_hasher_metrics(
+    current_admin: models.User = Depends(get_current_admin),
+):
+    return {
+        "success": True,
+        "message": "Password hasher metrics fetched",
+        "data": password_hasher.snapshot(),
+    }
@@ -1,66 +1,327 @@
+import asyncio
+import logging
+import os
 import uuid
-import json
 
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, and_, select, tuple_, union, union_all, update
+from sqlalchemy.orm import aliased
 
 from .. import models
-from ..auth import get_current_user
-from ..database import get_db
+from ..auth import get_current_user, invalidate_principal
+from ..database import AsyncSessionLocal, get_async_db
+from ..services.cache import TTLCache
+from ..services.conversations import mark_conversation_read, record_messages
+from ..services.fanout import FanoutBackend, FanoutBackendFactory
+from ..services.frames import JSON, EncodedFrame, decode_inbound, supported_encodings
+from ..services.message_writer import MessageBatchWriter
+from ..services.presence import OFFLINE, ONLINE, PresenceTracker
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+MAX_HISTORY_PAGE_SIZE = 200
+MAX_PRESENCE_QUERY_IDS = 200
+PRESENCE_COALESCE_SECONDS = float(os.getenv("PRESENCE_COALESCE_SECONDS", 2))
+PRESENCE_HEARTBEAT_SECONDS = float(os.getenv("PRESENCE_HEARTBEAT_SECONDS", 30))
+CHAT_SEND_QUEUE_SIZE = int(os.getenv("CHAT_SEND_QUEUE_SIZE", 256))
+CHAT_SEND_TIMEOUT_SECONDS = float(os.getenv("CHAT_SEND_TIMEOUT_SECONDS", 10))
+CHAT_PAIR_CACHE_TTL_SECONDS = float(os.getenv("CHAT_PAIR_CACHE_TTL_SECONDS", 300))
+CHAT_PAIR_CACHE_MAX_SIZE = int(os.getenv("CHAT_PAIR_CACHE_MAX_SIZE", 50000))
+
+
+def _bool_env(name: str, default: bool = False) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "y", "on"}
+
+
+# Group commit for inbound chat messages; off by default.
+CHAT_GROUP_COMMIT = _bool_env("CHAT_GROUP_COMMIT", default=False)
+CHAT_GROUP_COMMIT_MAX_ROWS = int(os.getenv("CHAT_GROUP_COMMIT_MAX_ROWS", 200))
+CHAT_GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("CHAT_GROUP_COMMIT_MAX_DELAY_MS", 5))
+
+# Pairs of users known to be allowed to message each other: the receiver
+# exists and neither side has blocked the other. Only positive results are
+# cached; a new block drops the pair on every worker.
+messaging_allowed_cache = TTLCache(
+    maxsize=CHAT_PAIR_CACHE_MAX_SIZE,
+    ttl_seconds=CHAT_PAIR_CACHE_TTL_SECONDS,
+)
+# Bumped on every invalidation so a lookup that raced with a new block does
+# not cache a stale "allowed".
+_pair_cache_generation = 0
+
+
+def _pair_key(user_a, user_b) -> tuple[str, str]:
+    a, b = str(user_a), str(user_b)
+    return (a, b) if a <= b else (b, a)
+
+
+def _forget_pair(user_ids: list[str]) -> None:
+    global _pair_cache_generation
+    _pair_cache_generation += 1
+    messaging_allowed_cache.pop(_pair_key(*user_ids))
+
+
+async def _load_presence_contacts(user_id: str) -> list[str]:
+    # Contacts are chat partners plus the other side of any pending request.
+    uid = uuid.UUID(user_id)
+    query = union(
+        select(models.Conversation.other_user_id)
+        .where(models.Conversation.user_id == uid),
+        select(models.DonationRequest.donor_id)
+        .where(
+            models.DonationRequest.seeker_id == uid,
+            models.DonationRequest.status == "pending",
+        ),
+        select(models.DonationRequest.seeker_id)
+        .where(
+            models.DonationRequest.donor_id == uid,
+            models.DonationRequest.status == "pending",
+        ),
+    )
+    async with AsyncSessionLocal() as db:
+        return [str(contact_id) for contact_id in await db.scalars(query)]
+
+
+class ChatConnection:
+    """One websocket with a bounded outbound queue drained by its own writer.
+
+    Enqueueing never waits, so a stalled client only fills its own queue.
+    The manager evicts the connection when the queue overflows or a send
+    fails or times out.
+    """
+
+    def __init__(
+        self,
+        manager: "ChatConnectionManager",
+        user_id: str,
+        websocket: WebSocket,
+        encoding: str = JSON,
+    ):
+        self.manager = manager
+        self.user_id = user_id
+        self.websocket = websocket
+        self.encoding = encoding
+        self.queue: asyncio.Queue[str | bytes] = asyncio.Queue(maxsize=CHAT_SEND_QUEUE_SIZE)
+        self.closed = False
+        self.writer = asyncio.create_task(self._drain())
+
+    def offer(self, data: str | bytes) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def send(self, message: dict) -> None:
+        self.manager.enqueue(self, EncodedFrame(message))
+
+    async def _drain(self):
+        while True:
+            data = await self.queue.get()
+            try:
+                async with asyncio.timeout(CHAT_SEND_TIMEOUT_SECONDS):
+                    if isinstance(data, bytes):
+                        await self.websocket.send_bytes(data)
+                    else:
+                        await self.websocket.send_text(data)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.manager.evict(self, "send_failed")
+                return
+
+    async def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        if self.writer is not asyncio.current_task():
+            self.writer.cancel()
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), CHAT_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
 
 # ======================================
-# IN-MEMORY CHAT CONNECTION MANAGER
+# CHAT CONNECTION MANAGER
+# Sockets live in this process; frames for users connected to other
+# workers travel through the fan-out backend.
 # ======================================
 class ChatConnectionManager:
-    def __init__(self):
-        # { user_id: [websocket, ...] }
-        self.active: dict[str, list[WebSocket]] = {}
+    def __init__(self, backend: FanoutBackend | None = None):
+        # { user_id: [connection, ...] }
+        self.active: dict[str, list[ChatConnection]] = {}
+        self.metrics = {
+            "frames_dropped": 0,
+            "evicted_overflow": 0,
+            "evicted_send_failed": 0,
+        }
+        self._closing: set[asyncio.Task] = set()
+        self.backend = backend or FanoutBackendFactory.create()
+        self.presence = PresenceTracker(
+            publish=self.backend.publish,
+            load_contacts=_load_presence_contacts,
+            notify=self._send_status,
+            coalesce_seconds=PRESENCE_COALESCE_SECONDS,
+            heartbeat_seconds=PRESENCE_HEARTBEAT_SECONDS,
+        )
+
+    async def start(self):
+        await self.backend.start(self._deliver)
+        await self.presence.start()
+
+    async def stop(self):
+        await self.presence.stop()
+        await self.backend.stop()
 
-    async def connect(self, user_id: str, websocket: WebSocket):
+    async def connect(
+        self,
+        user_id: str,
+        websocket: WebSocket,
+        encoding: str = JSON,
+    ) -> ChatConnection:
         await websocket.accept()
+        connection = ChatConnection(self, user_id, websocket, encoding)
         if user_id not in self.active:
             self.active[user_id] = []
-        self.active[user_id].append(websocket)
+        self.active[user_id].append(connection)
+
+        self.presence.mark(user_id, ONLINE)
+        return connection
+
+    def _remove(self, connection: ChatConnection) -> bool:
+        connections = self.active.get(connection.user_id)
+        if not connections or connection not in connections:
+            return False
+        connections.remove(connection)
+        if not connections:
+            del self.active[connection.user_id]
+            self.presence.mark(connection.user_id, OFFLINE)
+        return True
+
+    async def disconnect(self, user_id: str, connection: ChatConnection):
+        self._remove(connection)
+        await connection.close()
+
+    def enqueue(self, connection: ChatConnection, frame: EncodedFrame):
+        if not connection.offer(frame.encode(connection.encoding)):
+            self.metrics["frames_dropped"] += 1
+            self.evict(connection, "overflow")
+
+    def evict(self, connection: ChatConnection, reason: str):
+        if not self._remove(connection):
+            return
+        self.metrics[f"evicted_{reason}"] += 1
+        logger.info("Evicting chat connection for %s: %s", connection.user_id, reason)
+        # 1013: try again later
+        task = asyncio.create_task(connection.close(code=1013))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def snapshot(self) -> dict:
+        connections = [conn for conns in self.active.values() for conn in conns]
+        return {
+            "users": len(self.active),
+            "connections": len(connections),
+            "queued_frames": sum(conn.queue.qsize() for conn in connections),
+            **self.metrics,
+            "fanout": getattr(self.backend, "metrics", {}),
+            "pair_cache": {
+                "size": len(messaging_allowed_cache),
+                "hits": messaging_allowed_cache.hits,
+                "misses": messaging_allowed_cache.misses,
+            },
+        }
 
-        await self.broadcast_status(user_id, "online")
+    async def send_to_user(self, user_id: str, message: dict | EncodedFrame):
+        # Pass the same EncodedFrame to several users to serialize it once.
+        await self.backend.publish({"user_id": str(user_id), "message": message})
+
+    async def _deliver(self, envelope: dict):
+        if envelope.get("block"):
+            _forget_pair(envelope["user_ids"])
+            return
+
+        if envelope.get("principal"):
+            for uid in envelope["user_ids"]:
+                invalidate_principal(uuid.UUID(uid))
+            return
+
+        if envelope.get("presence_sync"):
+            if envelope["worker"] != self.presence.worker_id:
+                await self.presence.announce()
+            return
+
+        if envelope.get("presence_snapshot"):
+            self.presence.observe_snapshot(envelope["worker"], envelope["user_ids"])
+            return
+
+        if envelope.get("presence"):
+            user_id = envelope["user_id"]
+            if not self.presence.observe(envelope["worker"], user_id, envelope["status"]):
+                # Still connected through another worker (or already gone).
+                return
+            await self._send_status(user_id, envelope["status"], envelope["recipients"])
+            return
+
+        message = envelope["message"]
+        if not isinstance(message, EncodedFrame):
+            message = EncodedFrame(message)
+        await self._send_local(envelope["user_id"], message)
+
+    async def _send_status(self, user_id: str, status: str, recipients: list[str]):
+        frame = EncodedFrame({
+            "type": "status",
+            "user_id": user_id,
+            "status": status
+        })
+        for uid in recipients:
+            await self._send_local(uid, frame)
+
+    async def _send_local(self, user_id: str, frame: EncodedFrame):
+        connections = self.active.get(str(user_id))
+        if not connections:
+            return
+        for connection in list(connections):
+            self.enqueue(connection, frame)
 
-    async def disconnect(self, user_id: str, websocket: WebSocket):
-        if user_id in self.active:
-            self.active[user_id].remove(websocket)
-            if not self.active[user_id]:
-                del self.active[user_id]
 
-        await self.broadcast_status(user_id, "offline")
+chat_manager = ChatConnectionManager()
 
-    async def send_to_user(self, user_id: str, message: dict):
-        connections = self.active.get(str(user_id), [])
-        for ws in connections:
-            try:
-                await ws.send_text(json.dumps(message))
-            except Exception:
-                pass
+message_writer = (
+    MessageBatchWriter(
+        AsyncSessionLocal,
+        max_rows=CHAT_GROUP_COMMIT_MAX_ROWS,
+        max_delay_seconds=CHAT_GROUP_COMMIT_MAX_DELAY_MS / 1000,
+    )
+    if CHAT_GROUP_COMMIT
+    else None
+)
 
-    async def broadcast_status(self, user_id: str, status: str):
-        for uid in self.active:
-            if uid != user_id:
-                await self.send_to_user(uid, {
-                    "type": "status",
-                    "user_id": user_id,
-                    "status": status
-                })
 
+async def invalidate_chat_pair(user_a: uuid.UUID, user_b: uuid.UUID) -> None:
+    """Drop the cached messaging permission for a pair on every worker."""
+    await chat_manager.backend.publish({"block": True, "user_ids": [str(user_a), str(user_b)]})
 
-chat_manager = ChatConnectionManager()
 
+async def invalidate_principals(*user_ids: uuid.UUID) -> None:
+    """Drop the cached principals of ``user_ids`` on every worker."""
+    if user_ids:
+        await chat_manager.backend.publish({"principal": True, "user_ids": [str(uid) for uid in user_ids]})
 
-def _is_user_blocked(db: Session, user_a: uuid.UUID, user_b: uuid.UUID) -> bool:
-    block = (
-        db.query(models.UserBlock)
-        .filter(
+
+async def _is_user_blocked(db: AsyncSession, user_a: uuid.UUID, user_b: uuid.UUID) -> bool:
+    block = await db.scalar(
+        select(models.UserBlock.id)
+        .where(
             or_(
                 and_(
                     models.UserBlock.blocker_id == user_a,
@@ -72,21 +333,71 @@ def _is_user_blocked(db: Session, user_a: uuid.UUID, user_b: uuid.UUID) -> bool:
                 ),
             )
         )
-        .first()
+        .limit(1)
     )
     return block is not None
 
 
+async def _store_chat_message(
+    sender_id: uuid.UUID,
+    receiver_id: uuid.UUID,
+    content: str,
+    status: str,
+) -> tuple[models.Message | None, str | None]:
+    # Each frame gets its own short-lived session so an open socket never
+    # holds a pooled connection while it is idle.
+    key = _pair_key(sender_id, receiver_id)
+    if not messaging_allowed_cache.get(key):
+        generation = _pair_cache_generation
+        async with AsyncSessionLocal() as db:
+            receiver = await db.get(models.User, receiver_id)
+            if not receiver:
+                return None, "Receiver not found"
+
+            if await _is_user_blocked(db, sender_id, receiver_id):
+                return None, "Messaging is disabled between these users"
+
+        if generation == _pair_cache_generation:
+            messaging_allowed_cache.set(key, True)
+
+    if message_writer is not None:
+        try:
+            message = await message_writer.submit(
+                sender_id=sender_id,
+                receiver_id=receiver_id,
+                content=content,
+                status=status,
+            )
+        except Exception:
+            logger.exception("Could not store chat message from %s", sender_id)
+            return None, "Message could not be sent"
+        return message, None
+
+    async with AsyncSessionLocal() as db:
+        message = models.Message(
+            sender_id=sender_id,
+            receiver_id=receiver_id,
+            content=content,
+            status=status,
+        )
+        db.add(message)
+        await db.flush()
+        await record_messages(db, [message])
+        await db.commit()
+        await db.refresh(message)
+        return message, None
+
+
 # ======================================
 # WEBSOCKET CHAT ENDPOINT
-# ws://host/chat/ws/{user_id}?token=JWT
+# ws://host/chat/ws/{user_id}?token=JWT[&encoding=msgpack]
 # ======================================
 @router.websocket("/chat/ws/{user_id}")
 async def chat_websocket(
     websocket: WebSocket,
     user_id: str,
     token: str,
-    db: Session = Depends(get_db),
+    encoding: str = JSON,
 ):
     # Validate token manually (WebSocket can't use Depends for auth header)
     from jose import jwt, JWTError
@@ -109,19 +420,26 @@ async def chat_websocket(
         await websocket.close(code=4003)
         return
 
-    user = db.query(models.User).filter(models.User.id == token_user_id).first()
+    async with AsyncSessionLocal() as db:
+        user = await db.get(models.User, token_user_id)
     if not user:
         await websocket.close(code=4004)
         return
 
-    await chat_manager.connect(user_id, websocket)
+    # Unknown or unavailable encodings fall back to JSON text frames.
+    if encoding not in supported_encodings():
+        encoding = JSON
+
+    connection = await chat_manager.connect(user_id, websocket, encoding)
 
     try:
         while True:
-            raw = await websocket.receive_text()
+            raw = await websocket.receive()
+            if raw["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(raw.get("code", 1000))
 
             try:
-                data = json.loads(raw)
+                data = decode_inbound(raw, connection.encoding)
                 msg_type = data.get("type", "message")
                 receiver_id = uuid.UUID(data["receiver_id"])
 
@@ -146,43 +464,33 @@ async def chat_websocket(
                     continue
 
                 if msg_type != "message":
-                    await websocket.send_text(json.dumps({"error": "Unsupported message type"}))
+                    connection.send({"error": "Unsupported message type"})
                     continue
 
                 content = data.get("content", "").strip()
             except Exception:
-                await websocket.send_text(json.dumps({"error": "Invalid message format"}))
+                connection.send({"error": "Invalid message format"})
                 continue
 
             if not content:
                 continue
 
-            # Validate receiver exists
-            receiver = db.query(models.User).filter(models.User.id == receiver_id).first()
-            if not receiver:
-                await websocket.send_text(json.dumps({"error": "Receiver not found"}))
-                continue
-
-            if _is_user_blocked(db, token_user_id, receiver_id):
-                await websocket.send_text(json.dumps({"error": "Messaging is disabled between these users"}))
-                continue
-
             receiver_online = str(receiver_id) in chat_manager.active and bool(
                 chat_manager.active.get(str(receiver_id))
             )
 
-            # Save message to DB
-            message = models.Message(
-                sender_id=token_user_id,
-                receiver_id=receiver_id,
-                content=content,
-                status="delivered" if receiver_online else "sent",
+            # Validate receiver and save message to DB
+            message, error = await _store_chat_message(
+                token_user_id,
+                receiver_id,
+                content,
+                "delivered" if receiver_online else "sent",
             )
-            db.add(message)
-            db.commit()
-            db.refresh(message)
+            if error:
+                connection.send({"error": error})
+                continue
 
-            payload_out = {
+            payload_out = EncodedFrame({
                 "type": "chat_message",
                 "id": str(message.id),
                 "sender_id": str(message.sender_id),
@@ -191,7 +499,7 @@ async def chat_websocket(
                 "created_at": message.created_at.isoformat(),
                 "is_read": message.is_read,
                 "status": message.status,
-            }
+            })
 
             # Deliver to receiver if online
             await chat_manager.send_to_user(str(receiver_id), payload_out)
@@ -200,67 +508,166 @@ async def chat_websocket(
             await chat_manager.send_to_user(user_id, payload_out)
 
     except WebSocketDisconnect:
-        await chat_manager.disconnect(user_id, websocket)
+        pass
+    finally:
+        await chat_manager.disconnect(user_id, connection)
+
+
+def _history_page_query(
+    user_id: uuid.UUID,
+    other_user_id: uuid.UUID,
+    *,
+    limit: int,
+    before: uuid.UUID | None = None,
+    after: uuid.UUID | None = None,
+):
+    # Keyset pagination on (created_at, id). Each direction of the
+    # conversation is read separately so both halves are a bounded range
+    # scan on ix_messages_pair_created_at; the two pages are then merged.
+    newer = after is not None
+    cursor_id = after if newer else before
+
+    def direction(sender_id, receiver_id):
+        query = select(models.Message).where(
+            models.Message.sender_id == sender_id,
+            models.Message.receiver_id == receiver_id,
+        )
+        if cursor_id is not None:
+            cursor_created_at = (
+                select(models.Message.created_at)
+                .where(models.Message.id == cursor_id)
+                .scalar_subquery()
+            )
+            key = tuple_(models.Message.created_at, models.Message.id)
+            bound = tuple_(cursor_created_at, cursor_id)
+            query = query.where(key > bound if newer else key < bound)
+        if newer:
+            order = (models.Message.created_at.asc(), models.Message.id.asc())
+        else:
+            order = (models.Message.created_at.desc(), models.Message.id.desc())
+        return query.order_by(*order).limit(limit)
+
+    page = union_all(
+        direction(user_id, other_user_id),
+        direction(other_user_id, user_id),
+    ).subquery()
+    message = aliased(models.Message, page)
+    if newer:
+        order = (message.created_at.asc(), message.id.asc())
+    else:
+        order = (message.created_at.desc(), message.id.desc())
+    return select(message).order_by(*order).limit(limit)
 
 
 # ======================================
 # GET CHAT HISTORY BETWEEN TWO USERS
 # GET /chat/history/{other_user_id}
+# ?before=<message_id>  older page, ?after=<message_id>  newer page
+# ?offset=<n>  legacy: skip the n newest messages
 # ======================================
 @router.get("/chat/history/{other_user_id}")
 async def get_chat_history(
     other_user_id: uuid.UUID,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     limit: int = 50,
     offset: int = 0,
+    before: uuid.UUID | None = None,
+    after: uuid.UUID | None = None,
 ):
-    other_user = db.query(models.User).filter(models.User.id == other_user_id).first()
+    if not 1 <= limit <= MAX_HISTORY_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Limit must be between 1 and {MAX_HISTORY_PAGE_SIZE}",
+        )
+
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Offset must not be negative")
+
+    if offset and (before is not None or after is not None):
+        raise HTTPException(status_code=400, detail="Use either offset or before/after, not both")
+
+    other_user = await db.get(models.User, other_user_id)
     if not other_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if _is_user_blocked(db, current_user.id, other_user_id):
+    if await _is_user_blocked(db, current_user.id, other_user_id):
         raise HTTPException(status_code=403, detail="Messaging is disabled between these users")
 
-    messages = (
-        db.query(models.Message)
-        .filter(
-            or_(
-                and_(
-                    models.Message.sender_id == current_user.id,
-                    models.Message.receiver_id == other_user_id,
-                ),
-                and_(
-                    models.Message.sender_id == other_user_id,
-                    models.Message.receiver_id == current_user.id,
-                ),
+    if offset:
+        # Legacy offset paging, kept for older clients. Like the keyset pages
+        # it counts back from the newest message, so offset=0 and no offset
+        # return the same page.
+        messages = (
+            await db.scalars(
+                select(models.Message)
+                .where(
+                    or_(
+                        and_(
+                            models.Message.sender_id == current_user.id,
+                            models.Message.receiver_id == other_user_id,
+                        ),
+                        and_(
+                            models.Message.sender_id == other_user_id,
+                            models.Message.receiver_id == current_user.id,
+                        ),
+                    )
+                )
+                .order_by(models.Message.created_at.desc(), models.Message.id.desc())
+                .offset(offset)
+                .limit(limit)
             )
+        ).all()
+    else:
+        messages = (
+            await db.scalars(
+                _history_page_query(
+                    current_user.id,
+                    other_user_id,
+                    limit=limit,
+                    before=before,
+                    after=after,
+                )
+            )
+        ).all()
+
+    # Pages are always returned oldest first.
+    if after is None:
+        messages = list(reversed(messages))
+
+    # Mark messages sent to current_user as read in one statement
+    read_rows = (
+        await db.execute(
+            update(models.Message)
+            .where(
+                models.Message.sender_id == other_user_id,
+                models.Message.receiver_id == current_user.id,
+                models.Message.is_read == False,
+            )
+            .values(is_read=True, status="read")
+            .returning(models.Message.id, models.Message.created_at)
         )
-        .order_by(models.Message.created_at.asc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-
-    # Mark messages sent to current_user as read
-    updated = db.query(models.Message).filter(
-        models.Message.sender_id == other_user_id,
-        models.Message.receiver_id == current_user.id,
-        models.Message.is_read == False,
     ).all()
+    await mark_conversation_read(
+        db,
+        user_id=current_user.id,
+        other_user_id=other_user_id,
+        read_count=len(read_rows),
+    )
 
-    for msg in updated:
-        msg.is_read = True
-        msg.status = "read"
-
-    db.commit()
+    await db.commit()
 
-    for msg in updated:
+    if read_rows:
         await chat_manager.send_to_user(
             str(other_user_id),
             {
                 "type": "read_receipt",
-                "message_id": str(msg.id)
+                "reader_id": str(current_user.id),
+                "message_ids": [str(row.id) for row in read_rows],
+                "up_to": max(row.created_at for row in read_rows).isoformat(),
             }
         )
 
@@ -278,59 +685,101 @@ async def get_chat_history(
     ]
 
 
+# ======================================
+# BULK PRESENCE LOOKUP
+# GET /chat/presence?user_ids=<id>&user_ids=<id>
+# ======================================
+@router.get("/chat/presence")
+async def get_presence(
+    user_ids: list[uuid.UUID] = Query(...),
+    current_user: models.User = Depends(get_current_user),
+):
+    if len(user_ids) > MAX_PRESENCE_QUERY_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_PRESENCE_QUERY_IDS} user ids per request",
+        )
+
+    # Only contacts' presence is visible, same as the pushed status frames.
+    contacts = set(await _load_presence_contacts(str(current_user.id)))
+    return chat_manager.presence.statuses(
+        str(uid) for uid in user_ids if str(uid) in contacts
+    )
+
+
 # ======================================
 # GET ALL CONVERSATIONS (INBOX)
 # GET /chat/conversations
+# ?before=<other_user_id>  next page
 # ======================================
 @router.get("/chat/conversations")
-def get_conversations(
+async def get_conversations(
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = 50,
+    before: uuid.UUID | None = None,
 ):
-    from sqlalchemy import text
-
-    result = db.execute(text("""
-        SELECT DISTINCT ON (other_user_id)
-            other_user_id,
-            users.name AS other_user_name,
-            users.role AS other_user_role,
-            messages.content AS last_message,
-            messages.created_at AS last_message_at,
-            messages.is_read,
-            messages.sender_id
-        FROM (
-            SELECT
-                CASE
-                    WHEN sender_id = :uid THEN receiver_id
-                    ELSE sender_id
-                END AS other_user_id,
-                id, content, created_at, is_read, sender_id
-            FROM messages
-            WHERE sender_id = :uid OR receiver_id = :uid
-        ) AS messages
-        JOIN users ON users.id = messages.other_user_id
-        ORDER BY other_user_id, messages.created_at DESC
-    """), {"uid": current_user.id})
-
-    rows = result.fetchall()
-
-    blocked_ids = set(
-        str(item)
-        for (item,) in (
-            db.query(models.UserBlock.blocked_user_id)
-            .filter(models.UserBlock.blocker_id == current_user.id)
-            .all()
+    if not 1 <= limit <= MAX_HISTORY_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Limit must be between 1 and {MAX_HISTORY_PAGE_SIZE}",
         )
+
+    conversation = models.Conversation
+    blocked = (
+        select(models.UserBlock.id)
+        .where(
+            or_(
+                and_(
+                    models.UserBlock.blocker_id == current_user.id,
+                    models.UserBlock.blocked_user_id == conversation.other_user_id,
+                ),
+                and_(
+                    models.UserBlock.blocker_id == conversation.other_user_id,
+                    models.UserBlock.blocked_user_id == current_user.id,
+                ),
+            )
+        )
+        .exists()
     )
-    blocked_ids.update(
-        str(item)
-        for (item,) in (
-            db.query(models.UserBlock.blocker_id)
-            .filter(models.UserBlock.blocked_user_id == current_user.id)
-            .all()
+
+    query = (
+        select(
+            conversation.other_user_id,
+            models.User.name.label("other_user_name"),
+            models.User.role.label("other_user_role"),
+            conversation.last_message,
+            conversation.last_message_at,
+            conversation.last_sender_id,
+            conversation.unread_count,
         )
+        .join(models.User, models.User.id == conversation.other_user_id)
+        .where(conversation.user_id == current_user.id, ~blocked)
     )
 
+    if before is not None:
+        cursor_at = (
+            select(conversation.last_message_at)
+            .where(
+                conversation.user_id == current_user.id,
+                conversation.other_user_id == before,
+            )
+            .scalar_subquery()
+        )
+        query = query.where(
+            tuple_(conversation.last_message_at, conversation.other_user_id)
+            < tuple_(cursor_at, before)
+        )
+
+    rows = (
+        await db.execute(
+            query.order_by(
+                conversation.last_message_at.desc(),
+                conversation.other_user_id.desc(),
+            ).limit(limit)
+        )
+    ).all()
+
     return [
         {
             "other_user_id": str(row.other_user_id),
@@ -338,8 +787,8 @@ def get_conversations(
             "other_user_role": row.other_user_role,
             "last_message": row.last_message,
             "last_message_at": row.last_message_at.isoformat() if row.last_message_at else None,
-            "unread": not row.is_read and str(row.sender_id) != str(current_user.id),
+            "unread": row.unread_count > 0,
+            "unread_count": row.unread_count,
         }
         for row in rows
-        if str(row.other_user_id) not in blocked_ids
     ]
@@ -1,7 +1,12 @@
+import math
+import os
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from geoalchemy2.shape import to_shape
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from ..database import get_db
+from ..database import get_async_db
+from ..services.cache import TTLCache
 
 router = APIRouter()
 
@@ -14,25 +19,75 @@ ALLOWED_ORGAN_TYPES = {
     "bone_marrow"
 }
 
+NEARBY_CACHE_TTL_SECONDS = float(os.getenv("NEARBY_CACHE_TTL_SECONDS", 30))
+NEARBY_CACHE_MAX_SIZE = int(os.getenv("NEARBY_CACHE_MAX_SIZE", 2048))
+# Grid cell size in degrees; 0.005 is roughly 550 m of latitude.
+NEARBY_CACHE_CELL_DEGREES = float(os.getenv("NEARBY_CACHE_CELL_DEGREES", 0.005))
+NEARBY_MAX_RADIUS_KM = float(os.getenv("NEARBY_MAX_RADIUS_KM", 200))
+MAX_NEARBY_RESULTS = 50
+# Donors fetched per cached cell search; callers filter and cut from these.
+NEARBY_CANDIDATE_LIMIT = int(os.getenv("NEARBY_CANDIDATE_LIMIT", 500))
 
-@router.get("/nearby-donors")
-def get_nearby_donors(
-    latitude: float,
-    longitude: float,
-    organ_type: str,
-    radius_km: float = 5,
-    db: Session = Depends(get_db)
-):
-    organ_type_normalized = organ_type.lower().strip()
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
 
-    # Validate organ type
-    if organ_type_normalized not in ALLOWED_ORGAN_TYPES:
-        raise HTTPException(status_code=400, detail="Invalid organ type")
+# { (cell_lat, cell_lon, organ_type, radius_km): [donor row, ...] }
+# Rows are the donors within _search_radius_km(radius_km) of the cell
+# centre, nearest first, at most NEARBY_CANDIDATE_LIMIT of them.
+nearby_donors_cache = TTLCache(
+    maxsize=NEARBY_CACHE_MAX_SIZE,
+    ttl_seconds=NEARBY_CACHE_TTL_SECONDS,
+)
 
-    # Validate radius
-    if radius_km <= 0:
-        raise HTTPException(status_code=400, detail="Radius must be greater than 0")
 
+def _snap_to_cell(value: float) -> float:
+    cell = NEARBY_CACHE_CELL_DEGREES
+    return round(math.floor(value / cell) * cell + cell / 2, 6)
+
+
+def _search_radius_km(radius_km: float) -> float:
+    # Every point within radius_km of any caller in the cell lies within
+    # this distance of the cell centre: pad by the cell's half-diagonal
+    # (at most, at the equator) and 0.5% for sphere vs spheroid distance.
+    half_diagonal_km = NEARBY_CACHE_CELL_DEGREES * KM_PER_DEGREE * math.sqrt(2) / 2
+    return radius_km * 1.005 + half_diagonal_km
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def invalidate_nearby_donors(location, organ_type: str | None = None) -> None:
+    """Drop cached searches that could include a donor at ``location``."""
+    if location is None:
+        return
+    point = to_shape(location)
+    # A cached search covers _search_radius_km around the cell centre; pad
+    # by another 1% so haversine rounding cannot miss an edge donor.
+    stale = [
+        key
+        for key in nearby_donors_cache.keys()
+        if (organ_type is None or key[2] == organ_type)
+        and _haversine_km(key[0], key[1], point.y, point.x) <= _search_radius_km(key[3]) * 1.01
+    ]
+    nearby_donors_cache.pop_many(stale)
+
+
+async def _search_donors(
+    db: AsyncSession,
+    *,
+    latitude: float,
+    longitude: float,
+    organ_type: str,
+    radius_km: float,
+    limit: int,
+) -> list[dict]:
+    # `<->` walks the GiST index in distance order and stops after `limit`
+    # rows, so no distance is computed for donors that are not returned.
     query = text("""
     SELECT
         id,
@@ -42,14 +97,7 @@ def get_nearby_donors(
         donation_type,
         available,
         ST_Y(location::geometry) AS latitude,
-        ST_X(location::geometry) AS longitude,
-        ROUND(
-            ST_Distance(
-                location,
-                ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography
-            )::numeric / 1000,
-            2
-        ) as distance_km
+        ST_X(location::geometry) AS longitude
     FROM users
     WHERE role = 'donor'
       AND donation_type = :organ_type
@@ -61,17 +109,132 @@ def get_nearby_donors(
             ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography,
             :radius
         )
-    ORDER BY distance_km ASC
-    LIMIT 50
+    ORDER BY location <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography
+    LIMIT :limit
     """)
 
-    result = db.execute(query, {
+    result = await db.execute(query, {
         "lon": longitude,
         "lat": latitude,
         "radius": radius_km * 1000,  # convert km to meters
-        "organ_type": organ_type_normalized
+        "organ_type": organ_type,
+        "limit": limit,
     })
 
-    donors = result.fetchall()
+    return [dict(row._mapping) for row in result.fetchall()]
+
+
+@router.get("/nearby-donors")
+async def get_nearby_donors(
+    latitude: float,
+    longitude: float,
+    organ_type: str,
+    radius_km: float = 5,
+    nearest: int | None = None,
+    expand: bool = False,
+    max_radius_km: float = NEARBY_MAX_RADIUS_KM,
+    db: AsyncSession = Depends(get_async_db)
+):
+    organ_type_normalized = organ_type.lower().strip()
+
+    # Validate organ type
+    if organ_type_normalized not in ALLOWED_ORGAN_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid organ type")
+
+    # Validate radius
+    if radius_km <= 0:
+        raise HTTPException(status_code=400, detail="Radius must be greater than 0")
+
+    if max_radius_km <= 0 or max_radius_km > NEARBY_MAX_RADIUS_KM:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Max radius must be between 0 and {NEARBY_MAX_RADIUS_KM:g} km",
+        )
+
+    if nearest is not None and not 1 <= nearest <= MAX_NEARBY_RESULTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Nearest must be between 1 and {MAX_NEARBY_RESULTS}",
+        )
+
+    limit = nearest or MAX_NEARBY_RESULTS
+
+    # nearest: one KNN scan bounded by max_radius_km.
+    # expand: rings from radius_km, doubling until `limit` donors are found.
+    # default: fixed radius_km.
+    if expand:
+        radii = []
+        ring = min(radius_km, max_radius_km)
+        while ring < max_radius_km:
+            radii.append(ring)
+            ring *= 2
+        radii.append(max_radius_km)
+    elif nearest is not None:
+        radii = [max_radius_km]
+    else:
+        radii = [radius_km]
+
+    cell_lat = _snap_to_cell(latitude)
+    cell_lon = _snap_to_cell(longitude)
+    caller_offset_km = _haversine_km(cell_lat, cell_lon, latitude, longitude)
+
+    def within(rows: list[dict], ring_km: float) -> list[tuple[float, dict]]:
+        # Distances from the caller's own point, not the cell centre.
+        measured = [
+            (_haversine_km(latitude, longitude, row["latitude"], row["longitude"]), row)
+            for row in rows
+        ]
+        return sorted(
+            (item for item in measured if item[0] <= ring_km),
+            key=lambda item: item[0],
+        )
+
+    # Cached candidates are every donor the caller could see around the
+    # cell centre, so modes that cover the same area share entries.
+    donors: list[tuple[float, dict]] = []
+    for ring_km in radii:
+        cache_key = (cell_lat, cell_lon, organ_type_normalized, ring_km)
+        candidates = nearby_donors_cache.get(cache_key)
+        if candidates is None:
+            candidates = await _search_donors(
+                db,
+                latitude=cell_lat,
+                longitude=cell_lon,
+                organ_type=organ_type_normalized,
+                radius_km=_search_radius_km(ring_km),
+                limit=NEARBY_CANDIDATE_LIMIT,
+            )
+            nearby_donors_cache.set(cache_key, candidates)
+
+        donors = within(candidates, ring_km)
+
+        # A full candidate list was cut at the NEARBY_CANDIDATE_LIMIT-th
+        # donor from the cell centre. Anything cut is at least that far from
+        # the centre minus the caller's offset; if the caller needs donors
+        # beyond that, search from the caller's point directly.
+        if len(candidates) >= NEARBY_CANDIDATE_LIMIT:
+            cut_km = _haversine_km(
+                cell_lat, cell_lon, candidates[-1]["latitude"], candidates[-1]["longitude"]
+            ) - caller_offset_km
+            needed_km = donors[limit - 1][0] if len(donors) >= limit else ring_km
+            if needed_km > cut_km:
+                donors = within(
+                    await _search_donors(
+                        db,
+                        latitude=latitude,
+                        longitude=longitude,
+                        organ_type=organ_type_normalized,
+                        radius_km=ring_km,
+                        limit=limit,
+                    ),
+                    ring_km,
+                )
+
+        donors = donors[:limit]
+        if len(donors) >= limit:
+            break
 
-    return [dict(row._mapping) for row in donors]
+    return [
+        {**donor, "distance_km": round(distance_km, 2)}
+        for distance_km, donor in donors
+    ]
@@ -1,24 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
 from ..auth import get_current_user
-from ..database import get_db
+from ..database import get_async_db
 from ..services.audit import log_audit_event
+from .chat import invalidate_chat_pair
 
 router = APIRouter(tags=["moderation"])
 
 
 @router.post("/report-user")
-def report_user(
+async def report_user(
     payload: schemas.ReportUserRequest,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if payload.reported_user_id == current_user.id:
         raise HTTPException(status_code=400, detail="You cannot report yourself")
 
-    target = db.query(models.User).filter(models.User.id == payload.reported_user_id).first()
+    target = await db.get(models.User, payload.reported_user_id)
     if not target:
         raise HTTPException(status_code=404, detail="Reported user not found")
 
@@ -31,13 +33,11 @@ def report_user(
 
     block_created = False
     if payload.block_user:
-        existing_block = (
-            db.query(models.UserBlock)
-            .filter(
+        existing_block = await db.scalar(
+            select(models.UserBlock).where(
                 models.UserBlock.blocker_id == current_user.id,
                 models.UserBlock.blocked_user_id == payload.reported_user_id,
             )
-            .first()
         )
         if not existing_block:
             db.add(
@@ -48,10 +48,13 @@ def report_user(
             )
             block_created = True
 
-    db.commit()
-    db.refresh(report)
+    await db.commit()
+    await db.refresh(report)
 
-    log_audit_event(
+    if block_created:
+        await invalidate_chat_pair(current_user.id, payload.reported_user_id)
+
+    await log_audit_event(
         db,
         user_id=current_user.id,
         action_type="report_submission",
@@ -74,25 +77,23 @@ def report_user(
 
 
 @router.post("/block-user")
-def block_user(
+async def block_user(
     payload: schemas.BlockUserRequest,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if payload.user_id == current_user.id:
         raise HTTPException(status_code=400, detail="You cannot block yourself")
 
-    target = db.query(models.User).filter(models.User.id == payload.user_id).first()
+    target = await db.get(models.User, payload.user_id)
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
 
-    existing_block = (
-        db.query(models.UserBlock)
-        .filter(
+    existing_block = await db.scalar(
+        select(models.UserBlock).where(
             models.UserBlock.blocker_id == current_user.id,
             models.UserBlock.blocked_user_id == payload.user_id,
         )
-        .first()
     )
 
     if existing_block:
@@ -109,7 +110,9 @@ def block_user(
         blocked_user_id=payload.user_id,
     )
     db.add(block)
-    db.commit()
+    await db.commit()
+
+    await invalidate_chat_pair(current_user.id, payload.user_id)
 
     return {
         "success": True,
@@ -1,13 +1,20 @@
-from sqlalchemy import text
+from sqlalchemy import select, text, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from datetime import datetime
+import asyncio
+import os
 import uuid
 
-from .. import models
+from .. import models, schemas
 from ..auth import get_current_user
-from ..database import get_db
-from ..services.audit import log_audit_event
+from ..database import get_async_db
+from ..services.audit import audit_insert_from, log_audit_event
+from ..services.frames import EncodedFrame
 from .chat import chat_manager
+from .donors import NEARBY_MAX_RADIUS_KM
 
 router = APIRouter()
 
@@ -17,6 +24,13 @@ PENDING_STATUS = "pending"
 ACCEPTED_STATUS = "accepted"
 REJECTED_STATUS = "rejected"
 
+MAX_MY_REQUESTS_PAGE_SIZE = 200
+
+# Donors a single emergency broadcast reaches by default, and the most a
+# caller may ask for.
+BROADCAST_DONOR_LIMIT = int(os.getenv("BROADCAST_DONOR_LIMIT", 20))
+BROADCAST_MAX_DONOR_LIMIT = int(os.getenv("BROADCAST_MAX_DONOR_LIMIT", 500))
+
 
 # ================= NOTIFY DONOR =================
 async def _notify_user(user_id: uuid.UUID, message: str) -> None:
@@ -33,7 +47,7 @@ async def create_request(
     urgency: str,
     organ_type: str,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
 
     urgency_normalized = urgency.lower().strip()
@@ -48,10 +62,8 @@ async def create_request(
     if current_user.id == donor_id:
         raise HTTPException(status_code=400, detail="Cannot create a request to yourself")
 
-    donor = (
-        db.query(models.User)
-        .filter(models.User.id == donor_id, models.User.role == "donor")
-        .first()
+    donor = await db.scalar(
+        select(models.User).where(models.User.id == donor_id, models.User.role == "donor")
     )
 
     if not donor:
@@ -69,45 +81,51 @@ async def create_request(
             detail="Donor does not support this organ type"
         )
 
-    existing_pending_request = (
-        db.query(models.DonationRequest)
-        .filter(
-            models.DonationRequest.donor_id == donor_id,
-            models.DonationRequest.seeker_id == current_user.id,
-            models.DonationRequest.status == PENDING_STATUS,
+    # One statement inserts the request and its audit row. A pending
+    # request for the same pair trips uq_donation_requests_pending_pair, the
+    # insert yields nothing, and so does the audit insert.
+    request_id = uuid.uuid4()
+    new_request = (
+        pg_insert(models.DonationRequest)
+        .values(
+            id=request_id,
+            donor_id=donor_id,
+            seeker_id=current_user.id,
+            urgency=urgency_normalized,
+            organ_type=organ_type_normalized,
+            status=PENDING_STATUS,
+            created_at=datetime.utcnow(),
         )
-        .first()
+        .on_conflict_do_nothing(
+            index_elements=[models.DonationRequest.donor_id, models.DonationRequest.seeker_id],
+            # A literal predicate, not a bind parameter: Postgres must prove
+            # it implies the partial index's WHERE even under a generic plan.
+            index_where=text("status = 'pending'"),
+        )
+        .returning(models.DonationRequest.id)
+        .cte("new_request")
+    )
+    audited = await db.scalar(
+        audit_insert_from(
+            new_request,
+            user_id=current_user.id,
+            action_type="request_creation",
+            metadata={
+                "request_id": str(request_id),
+                "donor_id": str(donor_id),
+                "organ_type": organ_type_normalized,
+                "urgency": urgency_normalized,
+            },
+        ).returning(models.AuditLog.id)
     )
 
-    if existing_pending_request:
+    if audited is None:
         raise HTTPException(
             status_code=409,
             detail="A pending request already exists for this donor",
         )
 
-    new_request = models.DonationRequest(
-        donor_id=donor_id,
-        seeker_id=current_user.id,
-        urgency=urgency_normalized,
-        organ_type=organ_type_normalized,
-        status=PENDING_STATUS,
-    )
-
-    db.add(new_request)
-    db.commit()
-    db.refresh(new_request)
-
-    log_audit_event(
-        db,
-        user_id=current_user.id,
-        action_type="request_creation",
-        metadata={
-            "request_id": str(new_request.id),
-            "donor_id": str(donor_id),
-            "organ_type": organ_type_normalized,
-            "urgency": urgency_normalized,
-        },
-    )
+    await db.commit()
 
     await _notify_user(donor_id, "new_request")
 
@@ -115,40 +133,88 @@ async def create_request(
         "message": "Request sent successfully",
         "urgency": urgency_normalized,
         "organ_type": organ_type_normalized,
-        "request_id": new_request.id,
+        "request_id": request_id,
     }
 
 
+# ================= REQUEST TRANSITIONS =================
+async def _decide_requests(
+    db: AsyncSession,
+    donor_id: uuid.UUID,
+    request_ids: list[uuid.UUID],
+    new_status: str,
+) -> list:
+    # Ownership and the pending check live in the WHERE clause, so one
+    # statement both validates and applies the transition, and concurrent
+    # clicks cannot both win.
+    return (
+        await db.execute(
+            update(models.DonationRequest)
+            .where(
+                models.DonationRequest.id.in_(request_ids),
+                models.DonationRequest.donor_id == donor_id,
+                models.DonationRequest.status == PENDING_STATUS,
+            )
+            .values(status=new_status)
+            .returning(models.DonationRequest.id, models.DonationRequest.seeker_id)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+
+
+async def _transition_failure(
+    db: AsyncSession,
+    request_id: uuid.UUID,
+    donor_id: uuid.UUID,
+    action: str,
+) -> HTTPException:
+    # Only reached when the UPDATE matched nothing; work out why.
+    donation_request = await db.get(models.DonationRequest, request_id)
+
+    if not donation_request:
+        return HTTPException(status_code=404, detail="Request not found")
+
+    if donation_request.donor_id != donor_id:
+        return HTTPException(status_code=403, detail=f"Not allowed to {action} this request")
+
+    return HTTPException(status_code=409, detail=f"Only pending requests can be {action}ed")
+
+
+async def _notify_decisions(donor_id: uuid.UUID, decided: list, new_status: str) -> None:
+    # One frame per seeker, however many of their requests were decided.
+    by_seeker: dict[uuid.UUID, list[str]] = {}
+    for row in decided:
+        by_seeker.setdefault(row.seeker_id, []).append(str(row.id))
+
+    await asyncio.gather(
+        *(
+            chat_manager.send_to_user(
+                str(seeker_id),
+                {"type": f"request_{new_status}", "request_ids": request_ids},
+            )
+            for seeker_id, request_ids in by_seeker.items()
+        ),
+        _notify_user(donor_id, "request_updated"),
+    )
+
+
 # ================= ACCEPT REQUEST =================
 @router.put("/accept-request/{request_id}")
 async def accept_request(
     request_id: uuid.UUID,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
 
     if current_user.role != "donor":
         raise HTTPException(status_code=403, detail="Only donors can accept requests")
 
-    donation_request = (
-        db.query(models.DonationRequest)
-        .filter(models.DonationRequest.id == request_id)
-        .first()
-    )
-
-    if not donation_request:
-        raise HTTPException(status_code=404, detail="Request not found")
-
-    if donation_request.donor_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not allowed to accept this request")
-
-    if donation_request.status != PENDING_STATUS:
-        raise HTTPException(status_code=409, detail="Only pending requests can be accepted")
+    decided = await _decide_requests(db, current_user.id, [request_id], ACCEPTED_STATUS)
+    if not decided:
+        raise await _transition_failure(db, request_id, current_user.id, "accept")
 
-    donation_request.status = ACCEPTED_STATUS
-    db.commit()
-    await _notify_user(donation_request.seeker_id, "request_accepted")
-    await _notify_user(current_user.id, "request_updated")
+    await db.commit()
+    await _notify_decisions(current_user.id, decided, ACCEPTED_STATUS)
 
     return {"message": "Request accepted"}
 
@@ -158,42 +224,86 @@ async def accept_request(
 async def reject_request(
     request_id: uuid.UUID,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
 
     if current_user.role != "donor":
         raise HTTPException(status_code=403, detail="Only donors can reject requests")
 
-    donation_request = (
-        db.query(models.DonationRequest)
-        .filter(models.DonationRequest.id == request_id)
-        .first()
-    )
+    decided = await _decide_requests(db, current_user.id, [request_id], REJECTED_STATUS)
+    if not decided:
+        raise await _transition_failure(db, request_id, current_user.id, "reject")
 
-    if not donation_request:
-        raise HTTPException(status_code=404, detail="Request not found")
+    await db.commit()
+    await _notify_decisions(current_user.id, decided, REJECTED_STATUS)
 
-    if donation_request.donor_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not allowed to reject this request")
+    return {"message": "Request rejected"}
 
-    if donation_request.status != PENDING_STATUS:
-        raise HTTPException(status_code=409, detail="Only pending requests can be rejected")
 
-    donation_request.status = REJECTED_STATUS
-    db.commit()
-    await _notify_user(donation_request.seeker_id, "request_rejected")
-    await _notify_user(current_user.id, "request_updated")
+# ================= BULK ACCEPT / REJECT =================
+@router.put("/decide-requests")
+async def decide_requests(
+    payload: schemas.BulkRequestDecisionRequest,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
 
-    return {"message": "Request rejected"}
+    if current_user.role != "donor":
+        raise HTTPException(status_code=403, detail="Only donors can decide requests")
+
+    request_ids = list(dict.fromkeys(payload.request_ids))
+    decided = await _decide_requests(db, current_user.id, request_ids, payload.decision)
+    await db.commit()
+
+    if decided:
+        await _notify_decisions(current_user.id, decided, payload.decision)
+
+    # Anything not updated was unknown, someone else's, or no longer pending.
+    updated = {row.id for row in decided}
+    return {
+        "message": f"{len(updated)} request(s) {payload.decision}",
+        "updated": [request_id for request_id in request_ids if request_id in updated],
+        "skipped": [request_id for request_id in request_ids if request_id not in updated],
+    }
 
 
 # ================= GET MY REQUESTS =================
+def _my_requests_side(side_column, user_id: uuid.UUID, status: str | None, cursor, limit: int):
+    # One side (donor or seeker) of the user's requests, newest-first within
+    # priority, as a bounded scan of ix_donation_requests_<side>_priority.
+    query = select(
+        models.DonationRequest.id,
+        models.DonationRequest.priority,
+        models.DonationRequest.created_at,
+    ).where(side_column == user_id)
+
+    if status:
+        query = query.where(models.DonationRequest.status == status)
+
+    if cursor is not None:
+        query = query.where(
+            tuple_(
+                models.DonationRequest.priority,
+                models.DonationRequest.created_at,
+                models.DonationRequest.id,
+            ) < cursor
+        )
+
+    return query.order_by(
+        models.DonationRequest.priority.desc(),
+        models.DonationRequest.created_at.desc(),
+        models.DonationRequest.id.desc(),
+    ).limit(limit)
+
+
 @router.get("/my-requests/{user_id}")
-def get_my_requests(
+async def get_my_requests(
     user_id: uuid.UUID,
     status: str | None = None,
+    limit: int = 50,
+    cursor: uuid.UUID | None = None,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if user_id != current_user.id:
         raise HTTPException(
@@ -201,55 +311,90 @@ def get_my_requests(
             detail="Not allowed to view other users' requests",
         )
 
-    query = (
-        db.query(models.DonationRequest)
-        .options(
-            joinedload(models.DonationRequest.seeker),
-            joinedload(models.DonationRequest.donor),
-        )
-        .filter(
-            (models.DonationRequest.donor_id == user_id)
-            | (models.DonationRequest.seeker_id == user_id)
+    if not 1 <= limit <= MAX_MY_REQUESTS_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Limit must be between 1 and {MAX_MY_REQUESTS_PAGE_SIZE}",
         )
-    )
 
-    if status:
-        query = query.filter(models.DonationRequest.status == status)
-
-    requests = query.order_by(
-        models.DonationRequest.urgency.desc(),
-        models.DonationRequest.created_at.desc()
-        ).all()
-
-    priority_map = {
-        "critical": 4,
-        "high": 3,
-        "medium": 2,
-        "low": 1
-    }
+    # The cursor is the id of the last request on the previous page.
+    cursor_key = None
+    if cursor is not None:
+        cursor_row = (
+            await db.execute(
+                select(
+                    models.DonationRequest.priority,
+                    models.DonationRequest.created_at,
+                    models.DonationRequest.id,
+                ).where(
+                    models.DonationRequest.id == cursor,
+                    (models.DonationRequest.donor_id == user_id)
+                    | (models.DonationRequest.seeker_id == user_id),
+                )
+            )
+        ).first()
+        if cursor_row is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        cursor_key = tuple_(*cursor_row)
+
+    page = union_all(
+        _my_requests_side(models.DonationRequest.donor_id, user_id, status, cursor_key, limit),
+        _my_requests_side(models.DonationRequest.seeker_id, user_id, status, cursor_key, limit),
+    ).subquery("page")
+
+    seeker = aliased(models.User)
+    donor = aliased(models.User)
+    rows = (
+        await db.execute(
+            select(
+                models.DonationRequest.id,
+                models.DonationRequest.urgency,
+                models.DonationRequest.priority,
+                models.DonationRequest.status,
+                models.DonationRequest.organ_type,
+                models.DonationRequest.donor_id,
+                models.DonationRequest.seeker_id,
+                models.DonationRequest.created_at,
+                seeker.name.label("seeker_name"),
+                seeker.blood_group.label("seeker_blood_group"),
+                seeker.email.label("seeker_email"),
+                donor.name.label("donor_name"),
+                donor.blood_group.label("donor_blood_group"),
+            )
+            .join(page, page.c.id == models.DonationRequest.id)
+            .outerjoin(seeker, seeker.id == models.DonationRequest.seeker_id)
+            .outerjoin(donor, donor.id == models.DonationRequest.donor_id)
+            .order_by(
+                page.c.priority.desc(),
+                page.c.created_at.desc(),
+                page.c.id.desc(),
+            )
+            .limit(limit)
+        )
+    ).all()
 
     return [
         {
-            "id": request_item.id,
-            "urgency": request_item.urgency,
-            "priority": priority_map.get(request_item.urgency, 1),
-            "badge": "🚨 EMERGENCY" if request_item.urgency == "critical" else None,
-            "status": request_item.status,
-            "organ_type": request_item.organ_type,
+            "id": row.id,
+            "urgency": row.urgency,
+            "priority": row.priority,
+            "badge": "🚨 EMERGENCY" if row.urgency == "critical" else None,
+            "status": row.status,
+            "organ_type": row.organ_type,
 
-            "donor_id": request_item.donor_id,
-            "seeker_id": request_item.seeker_id,
+            "donor_id": row.donor_id,
+            "seeker_id": row.seeker_id,
 
-            "seeker_name": request_item.seeker.name if request_item.seeker else None,
-            "seeker_blood_group": request_item.seeker.blood_group if request_item.seeker else None,
-            "seeker_email": request_item.seeker.email if request_item.seeker else None,
+            "seeker_name": row.seeker_name,
+            "seeker_blood_group": row.seeker_blood_group,
+            "seeker_email": row.seeker_email,
 
-            "donor_name": request_item.donor.name if request_item.donor else None,
-            "donor_blood_group": request_item.donor.blood_group if request_item.donor else None,
+            "donor_name": row.donor_name,
+            "donor_blood_group": row.donor_blood_group,
 
-            "created_at": request_item.created_at,
+            "created_at": row.created_at,
         }
-        for request_item in requests
+        for row in rows
     ]
 
 
@@ -260,45 +405,90 @@ async def broadcast_request(
     latitude: float,
     longitude: float,
     radius_km: float = 10,
+    limit: int = BROADCAST_DONOR_LIMIT,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
+    urgency_normalized = urgency.lower().strip()
+    organ_type_normalized = organ_type.lower().strip()
+
+    if urgency_normalized not in ALLOWED_URGENCY_LEVELS:
+        raise HTTPException(status_code=400, detail="Invalid urgency level")
+
+    if radius_km <= 0 or radius_km > NEARBY_MAX_RADIUS_KM:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Radius must be between 0 and {NEARBY_MAX_RADIUS_KM:g} km",
+        )
+
+    if not 1 <= limit <= BROADCAST_MAX_DONOR_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Limit must be between 1 and {BROADCAST_MAX_DONOR_LIMIT}",
+        )
+
+    # Nearest donors first. Donors who already have a pending request from
+    # this seeker are excluded before the LIMIT so they do not use up its
+    # slots; ON CONFLICT only covers a concurrent request for the same pair.
     query = text("""
-    SELECT id
+    INSERT INTO donation_requests
+        (id, donor_id, seeker_id, organ_type, urgency, status, created_at)
+    SELECT
+        gen_random_uuid(), id, :seeker_id, :organ_type, :urgency, 'pending', :created_at
     FROM users
     WHERE role='donor'
     AND available = TRUE
     AND is_verified_donor = TRUE
     AND verification_status = 'approved'
     AND donation_type = :organ_type
+    AND id <> :seeker_id
     AND ST_DWithin(
         location,
         ST_SetSRID(ST_MakePoint(:lon,:lat),4326)::geography,
         :radius
     )
-    LIMIT 20
+    AND NOT EXISTS (
+        SELECT 1 FROM donation_requests pending
+        WHERE pending.donor_id = users.id
+        AND pending.seeker_id = :seeker_id
+        AND pending.status = 'pending'
+    )
+    ORDER BY location <-> ST_SetSRID(ST_MakePoint(:lon,:lat),4326)::geography
+    LIMIT :limit
+    ON CONFLICT (donor_id, seeker_id) WHERE status = 'pending' DO NOTHING
+    RETURNING id, donor_id
     """)
-    donors = db.execute(query, {
+    created = (await db.execute(query, {
+        "seeker_id": current_user.id,
+        "organ_type": organ_type_normalized,
+        "urgency": urgency_normalized,
+        "created_at": datetime.utcnow(),
         "lon": longitude,
         "lat": latitude,
         "radius": radius_km * 1000,
-        "organ_type": organ_type
-    }).fetchall()
-    for donor in donors:
-        new_request = models.DonationRequest(
-            donor_id=donor.id,
-            seeker_id=current_user.id,
-            organ_type=organ_type,
-            urgency=urgency,
-            status="pending"
-        )
-        db.add(new_request)
+        "limit": limit,
+    })).fetchall()
 
-    db.commit()
+    # Commits the new requests and their audit row together.
+    await log_audit_event(
+        db,
+        user_id=current_user.id,
+        action_type="request_broadcast",
+        metadata={
+            "organ_type": organ_type_normalized,
+            "urgency": urgency_normalized,
+            "radius_km": radius_km,
+            "request_ids": [str(row.id) for row in created],
+        },
+        durable=True,
+    )
+
+    frame = EncodedFrame({"type": "emergency_request"})
+    await asyncio.gather(
+        *(chat_manager.send_to_user(str(row.donor_id), frame) for row in created)
+    )
 
-    for donor in donors:
-        await _notify_user(donor.id, "emergency_request")
     return {
         "message": "Emergency request broadcasted",
-        "donors_notified": len(donors)
+        "donors_notified": len(created)
     }
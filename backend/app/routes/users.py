@@ -1,14 +1,16 @@
 import os
 import uuid
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from geoalchemy2.shape import from_shape
 from shapely.geometry import Point
 from pydantic import BaseModel
 
-from ..database import get_db
+from ..database import AsyncSessionLocal, get_async_db
 from .. import models
 from ..auth import (
     create_access_token,
@@ -18,16 +20,21 @@ from ..auth import (
 from ..auth import ENFORCE_EMAIL_VERIFICATION, get_current_user
 from ..services.audit import log_audit_event
 from ..services.email_provider import EmailProviderFactory
+from ..services.frames import dumps_json
+from ..services.passwords import PasswordHasherBusy, password_hasher
+from .chat import invalidate_principals
+from .donors import invalidate_nearby_donors
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 ALLOWED_DONATION_TYPES = {
     "blood", "kidney", "liver", "heart", "cornea", "bone_marrow"
 }
 ALLOWED_ROLES = {"donor", "seeker"}
 
+MAX_DONATION_HISTORY_PAGE_SIZE = 200
+DONATION_HISTORY_EXPORT_BATCH_SIZE = 500
+
 
 def _bool_env(name: str, default: bool = False) -> bool:
     raw = os.getenv(name)
@@ -36,11 +43,19 @@ def _bool_env(name: str, default: bool = False) -> bool:
     return raw.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
+def _password_hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy, please try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 # ================= LOGIN (OAuth2 compatible) =================
 @router.post("/login")
 async def login(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     email = None
     password = None
@@ -71,22 +86,34 @@ async def login(
     if not email_normalized or not password_value:
         raise HTTPException(status_code=422, detail="Missing login credentials")
 
-    user = db.query(models.User).filter(
-        func.lower(models.User.email) == email_normalized
-    ).first()
+    user = await db.scalar(
+        select(models.User).where(func.lower(models.User.email) == email_normalized)
+    )
 
     if not user:
         raise HTTPException(status_code=400, detail="Invalid email")
 
-    if not pwd_context.verify(password_value, user.password):
+    try:
+        valid, new_hash = await password_hasher.verify_and_update(password_value, user.password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
+
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid password")
 
+    # Stored with a different bcrypt cost than BCRYPT_ROUNDS: upgrade it now
+    # that we have the plaintext.
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+        await invalidate_principals(user.id)
+
     if ENFORCE_EMAIL_VERIFICATION and not user.email_verified:
         raise HTTPException(status_code=403, detail="Email is not verified")
 
     access_token = create_access_token(data={"sub": str(user.id)})
 
-    log_audit_event(
+    await log_audit_event(
         db,
         user_id=user.id,
         action_type="login",
@@ -112,7 +139,7 @@ async def login(
 
 # ================= REGISTER =================
 @router.post("/register")
-def register_user(
+async def register_user(
     name: str,
     email: str,
     password: str,
@@ -122,7 +149,7 @@ def register_user(
     phone: str = None,
     latitude: float = None,
     longitude: float = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     email_normalized = email.lower().strip()
     role_normalized = role.lower().strip()
@@ -140,13 +167,16 @@ def register_user(
     if role_normalized == "donor" and (latitude is None or longitude is None):
         raise HTTPException(status_code=400, detail="Location is required for donor registration")
 
-    existing_user = db.query(models.User).filter(
-        func.lower(models.User.email) == email_normalized
-    ).first()
+    existing_user = await db.scalar(
+        select(models.User).where(func.lower(models.User.email) == email_normalized)
+    )
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = pwd_context.hash(password)
+    try:
+        hashed_pw = await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy()
 
     location_point = None
     if latitude is not None and longitude is not None:
@@ -171,13 +201,14 @@ def register_user(
     )
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     verification_token = create_email_verification_token(user_id=user.id, email=user.email)
     verification_base_url = os.getenv("PUBLIC_API_BASE_URL", "http://192.168.1.23:8000")
     verification_url = f"{verification_base_url}/verify-email?token={verification_token}"
-    EmailProviderFactory.create().send_verification_email(
+    await run_in_threadpool(
+        EmailProviderFactory.create().send_verification_email,
         to_email=user.email,
         verification_url=verification_url,
     )
@@ -199,9 +230,9 @@ def register_user(
 
 
 @router.get("/verify-email")
-def verify_email(
+async def verify_email(
     token: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     payload = decode_email_verification_token(token)
     try:
@@ -209,7 +240,7 @@ def verify_email(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid verification token payload")
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -217,7 +248,8 @@ def verify_email(
         raise HTTPException(status_code=400, detail="Verification token mismatch")
 
     user.email_verified = True
-    db.commit()
+    await db.commit()
+    await invalidate_principals(user.id)
 
     return {
         "success": True,
@@ -231,18 +263,29 @@ def verify_email(
 
 # ================= TOGGLE AVAILABILITY =================
 @router.put("/toggle-availability")
-def toggle_availability(
+async def toggle_availability(
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    current_user.available = not current_user.available
-    db.commit()
+    # Flip the stored value, not the principal: it may be a cached copy
+    # that is stale on this worker.
+    available = await db.scalar(
+        update(models.User)
+        .where(models.User.id == current_user.id)
+        .values(available=~models.User.available)
+        .returning(models.User.available)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await invalidate_principals(current_user.id)
+    if current_user.role == "donor":
+        invalidate_nearby_donors(current_user.location, current_user.donation_type)
 
     return {
         "success": True,
         "message": "Availability updated",
         "data": {
-            "available": current_user.available,
+            "available": available,
         },
     }
 
@@ -277,11 +320,14 @@ class UpdateProfile(BaseModel):
 
 
 @router.put("/users/me")
-def update_profile(
+async def update_profile(
     data: UpdateProfile,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    was_donor = current_user.role == "donor"
+    previous_location = current_user.location
+
     if data.name is not None:
         current_user.name = data.name
 
@@ -317,8 +363,12 @@ def update_profile(
     if data.latitude is not None and data.longitude is not None:
         current_user.location = from_shape(Point(data.longitude, data.latitude), srid=4326)
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await invalidate_principals(current_user.id)
+    if was_donor or current_user.role == "donor":
+        invalidate_nearby_donors(previous_location)
+        invalidate_nearby_donors(current_user.location)
+    await db.refresh(current_user)
 
     return {
         "success": True,
@@ -329,26 +379,118 @@ def update_profile(
     }
 
 
+def _naive_utc(value: datetime) -> datetime:
+    # donation_requests.created_at is naive UTC.
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _donation_history_query(
+    user: models.User,
+    *,
+    status: str | None,
+    since: datetime | None,
+    until: datetime | None,
+):
+    side_column = (
+        models.DonationRequest.seeker_id
+        if user.role == "seeker"
+        else models.DonationRequest.donor_id
+    )
+    # Served by ix_donation_requests_<side>_created_at.
+    query = select(
+        models.DonationRequest.id,
+        models.DonationRequest.organ_type,
+        models.DonationRequest.status,
+        models.DonationRequest.created_at,
+    ).where(side_column == user.id)
+
+    if status:
+        query = query.where(models.DonationRequest.status == status.strip().lower())
+    if since is not None:
+        query = query.where(models.DonationRequest.created_at >= _naive_utc(since))
+    if until is not None:
+        query = query.where(models.DonationRequest.created_at < _naive_utc(until))
+
+    return query.order_by(
+        models.DonationRequest.created_at.desc(),
+        models.DonationRequest.id.desc(),
+    )
+
+
+def _donation_history_item(row) -> dict:
+    return {
+        "id": row.id,
+        "organ_type": row.organ_type,
+        "status": row.status,
+        "created_at": row.created_at,
+    }
+
+
 @router.get("/donation-history")
-def get_donation_history(
+async def get_donation_history(
+    status: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = 50,
+    cursor: uuid.UUID | None = None,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if current_user.role == "seeker":
-        history = db.query(models.DonationRequest).filter(
-            models.DonationRequest.seeker_id == current_user.id
-        ).all()
-    else:
-        history = db.query(models.DonationRequest).filter(
-            models.DonationRequest.donor_id == current_user.id
-        ).all()
-
-    return [
-        {
-            "id": req.id,
-            "organ_type": req.organ_type,
-            "status": req.status,
-            "created_at": req.created_at,
-        }
-        for req in history
-    ]
+    if not 1 <= limit <= MAX_DONATION_HISTORY_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Limit must be between 1 and {MAX_DONATION_HISTORY_PAGE_SIZE}",
+        )
+
+    query = _donation_history_query(current_user, status=status, since=since, until=until)
+
+    # The cursor is the id of the last request on the previous page.
+    if cursor is not None:
+        cursor_row = (
+            await db.execute(
+                select(models.DonationRequest.created_at, models.DonationRequest.id).where(
+                    models.DonationRequest.id == cursor,
+                    (models.DonationRequest.donor_id == current_user.id)
+                    | (models.DonationRequest.seeker_id == current_user.id),
+                )
+            )
+        ).first()
+        if cursor_row is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(
+            tuple_(models.DonationRequest.created_at, models.DonationRequest.id)
+            < tuple_(*cursor_row)
+        )
+
+    history = (await db.execute(query.limit(limit))).all()
+
+    return [_donation_history_item(row) for row in history]
+
+
+@router.get("/donation-history/export")
+async def export_donation_history(
+    status: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    current_user: models.User = Depends(get_current_user),
+):
+    query = _donation_history_query(current_user, status=status, since=since, until=until)
+
+    async def rows():
+        # Its own session: the response body is produced after the handler
+        # returns. db.stream() reads through a server-side cursor, so memory
+        # stays flat however long the history is.
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(
+                query.execution_options(yield_per=DONATION_HISTORY_EXPORT_BATCH_SIZE)
+            )
+            async for row in result:
+                yield dumps_json(_donation_history_item(row)) + "\n"
+
+    return StreamingResponse(
+        rows(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="donation-history.ndjson"'},
+    )
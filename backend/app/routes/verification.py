@@ -3,11 +3,14 @@ import hmac
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
 from ..auth import get_current_user
-from ..database import get_db
+from ..database import get_async_db
+from .chat import invalidate_principals
 from ..services.otp import (
     OTP_MAX_SENDS_PER_HOUR,
     OTP_MAX_VERIFY_ATTEMPTS,
@@ -29,10 +32,10 @@ def _bool_env(name: str, default: bool = False) -> bool:
 
 
 @router.post("/send-otp")
-def send_otp(
+async def send_otp(
     payload: schemas.SendOTPRequest,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if payload.phone is not None:
         current_user.phone = payload.phone.strip()
@@ -45,33 +48,37 @@ def send_otp(
     last_send_boundary = now - timedelta(seconds=OTP_MIN_SEND_INTERVAL_SECONDS)
     hour_boundary = now - timedelta(hours=1)
 
-    recent_send = (
-        db.query(models.OTPVerification)
-        .filter(
+    recent_send = await db.scalar(
+        select(models.OTPVerification)
+        .where(
             models.OTPVerification.user_id == current_user.id,
             models.OTPVerification.last_sent_at >= last_send_boundary,
         )
         .order_by(models.OTPVerification.last_sent_at.desc())
-        .first()
+        .limit(1)
     )
     if recent_send:
         raise HTTPException(status_code=429, detail="OTP sent too recently. Please wait before retrying")
 
-    hourly_count = (
-        db.query(models.OTPVerification)
-        .filter(
+    hourly_count = await db.scalar(
+        select(func.count())
+        .select_from(models.OTPVerification)
+        .where(
             models.OTPVerification.user_id == current_user.id,
             models.OTPVerification.created_at >= hour_boundary,
         )
-        .count()
     )
     if hourly_count >= OTP_MAX_SENDS_PER_HOUR:
         raise HTTPException(status_code=429, detail="OTP request limit reached. Try again later")
 
-    db.query(models.OTPVerification).filter(
-        models.OTPVerification.user_id == current_user.id,
-        models.OTPVerification.verified == False,
-    ).update({"expires_at": now})
+    await db.execute(
+        update(models.OTPVerification)
+        .where(
+            models.OTPVerification.user_id == current_user.id,
+            models.OTPVerification.verified == False,
+        )
+        .values(expires_at=now)
+    )
 
     otp_code = generate_otp_code()
     otp_hash = hash_otp_code(current_user.id, otp_code)
@@ -85,10 +92,15 @@ def send_otp(
         last_sent_at=now,
     )
     db.add(otp_row)
-    db.commit()
+    await db.commit()
+    await invalidate_principals(current_user.id)
 
     message = f"Your Reviva verification code is {otp_code}. It expires in 5 minutes."
-    SMSProviderFactory.create().send_sms(to_phone=current_user.phone, message=message)
+    await run_in_threadpool(
+        SMSProviderFactory.create().send_sms,
+        to_phone=current_user.phone,
+        message=message,
+    )
 
     response_data = {
         "phone": current_user.phone,
@@ -105,22 +117,22 @@ def send_otp(
 
 
 @router.post("/verify-otp")
-def verify_otp(
+async def verify_otp(
     payload: schemas.VerifyOTPRequest,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     now = datetime.utcnow()
 
-    otp_row = (
-        db.query(models.OTPVerification)
-        .filter(
+    otp_row = await db.scalar(
+        select(models.OTPVerification)
+        .where(
             models.OTPVerification.user_id == current_user.id,
             models.OTPVerification.verified == False,
             models.OTPVerification.expires_at >= now,
         )
         .order_by(models.OTPVerification.created_at.desc())
-        .first()
+        .limit(1)
     )
 
     if not otp_row:
@@ -134,7 +146,7 @@ def verify_otp(
 
     expected_hash = hash_otp_code(current_user.id, payload.otp_code)
     if not hmac.compare_digest(otp_row.otp_code, expected_hash):
-        db.commit()
+        await db.commit()
         remaining = max(0, OTP_MAX_VERIFY_ATTEMPTS - otp_row.attempts)
         raise HTTPException(
             status_code=400,
@@ -143,7 +155,8 @@ def verify_otp(
 
     otp_row.verified = True
     current_user.phone_verified = True
-    db.commit()
+    await db.commit()
+    await invalidate_principals(current_user.id)
 
     return {
         "success": True,
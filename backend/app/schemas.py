@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import uuid
+from datetime import datetime
 from typing import Any, Literal
 
 from pydantic import BaseModel, Field
@@ -30,10 +31,21 @@ class BlockUserRequest(BaseModel):
     user_id: uuid.UUID
 
 
+class BulkRequestDecisionRequest(BaseModel):
+    request_ids: list[uuid.UUID] = Field(min_length=1, max_length=200)
+    decision: Literal["accepted", "rejected"]
+
+
 class AdminDonorDecisionRequest(BaseModel):
     reason: str | None = Field(default=None, max_length=1000)
 
 
+class AdminBulkDonorDecisionRequest(BaseModel):
+    user_ids: list[uuid.UUID] = Field(min_length=1, max_length=5000)
+    decision: Literal["approved", "rejected"]
+    reason: str | None = Field(default=None, max_length=1000)
+
+
 class PendingDonorItem(BaseModel):
     id: uuid.UUID
     name: str
@@ -42,10 +54,12 @@ class PendingDonorItem(BaseModel):
     blood_group: str | None = None
     donation_type: str | None = None
     verification_status: Literal["pending", "approved", "rejected"]
+    registered_at: datetime | None = None
 
 
 class PendingDonorsResponse(APIResponse):
     data: list[PendingDonorItem]
+    next_cursor: uuid.UUID | None = None
 
 
 class VerifyEmailResponse(APIResponse):
@@ -1,25 +1,197 @@
+import asyncio
+import logging
+import os
 import uuid
 from datetime import datetime
 
-from sqlalchemy.orm import Session
+from sqlalchemy import JSON, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from .. import models
+from ..database import AsyncSessionLocal
 
+logger = logging.getLogger(__name__)
 
-def log_audit_event(
-    db: Session,
+# "async" queues events for the background writer; "sync" writes every event
+# inside the request, as individual durable=True calls always do.
+AUDIT_LOG_MODE = os.getenv("AUDIT_LOG_MODE", "async").strip().lower()
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", 10000))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+AUDIT_FLUSH_INTERVAL_MS = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", 200))
+AUDIT_MAX_RETRIES = int(os.getenv("AUDIT_MAX_RETRIES", 3))
+
+
+class AuditSink:
+    """Background writer that flushes queued audit rows in bulk.
+
+    Rows are written with one multi-row INSERT per batch of up to
+    ``batch_size``, at most ``flush_interval_seconds`` after the first row
+    of the batch arrived. ``enqueue`` never waits: when the queue is full it
+    returns False and the caller writes the row itself. A failed batch is
+    retried; rows that still cannot be written are logged in full.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        queue_size: int,
+        batch_size: int,
+        flush_interval_seconds: float,
+        max_retries: int,
+    ):
+        self._session_factory = session_factory
+        self._queue_size = queue_size
+        self._batch_size = max(1, batch_size)
+        self._flush_interval_seconds = flush_interval_seconds
+        self._max_retries = max_retries
+        self._queue: asyncio.Queue | None = None
+        self._runner: asyncio.Task | None = None
+        self.metrics = {"written": 0, "batches": 0, "overflow": 0, "dropped": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    async def start(self) -> None:
+        if self._runner is None:
+            self._queue = asyncio.Queue(maxsize=self._queue_size)
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Flushes everything already queued before returning.
+        if self._runner is None:
+            return
+        runner, self._runner = self._runner, None
+        await self._queue.put(None)
+        await runner
+
+    def enqueue(self, row: dict) -> bool:
+        if self._runner is None:
+            return False
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.metrics["overflow"] += 1
+            return False
+        return True
+
+    def snapshot(self) -> dict:
+        return {
+            "mode": AUDIT_LOG_MODE,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            **self.metrics,
+        }
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+
+            deadline = asyncio.get_running_loop().time() + self._flush_interval_seconds
+            while len(batch) < self._batch_size:
+                try:
+                    if self._queue.empty():
+                        async with asyncio.timeout_at(deadline):
+                            row = await self._queue.get()
+                    else:
+                        row = self._queue.get_nowait()
+                except TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._flush(batch)
+
+    async def _flush(self, rows: list[dict]) -> None:
+        for attempt in range(1, self._max_retries + 1):
+            try:
+                async with self._session_factory() as db:
+                    await db.execute(insert(models.AuditLog), rows)
+                    await db.commit()
+            except Exception:
+                logger.exception("Audit batch of %d failed (attempt %d)", len(rows), attempt)
+                await asyncio.sleep(0.5 * attempt)
+                continue
+            self.metrics["written"] += len(rows)
+            self.metrics["batches"] += 1
+            return
+
+        self.metrics["dropped"] += len(rows)
+        for row in rows:
+            logger.error("Dropped audit event: %r", row)
+
+
+audit_sink = AuditSink(
+    AsyncSessionLocal,
+    queue_size=AUDIT_QUEUE_SIZE,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval_seconds=AUDIT_FLUSH_INTERVAL_MS / 1000,
+    max_retries=AUDIT_MAX_RETRIES,
+)
+
+
+async def log_audit_event(
+    db: AsyncSession,
     *,
     user_id: uuid.UUID,
     action_type: str,
     metadata: dict | None = None,
+    durable: bool = False,
 ) -> models.AuditLog:
+    """Record an audit event.
+
+    By default the event is handed to the background sink and the request
+    does not wait for it. With ``durable=True`` (or AUDIT_LOG_MODE=sync) the
+    row is added to ``db`` and committed together with whatever the caller
+    has pending, so it is on disk before the response is sent.
+    """
     entry = models.AuditLog(
+        id=uuid.uuid4(),
         user_id=user_id,
         action_type=action_type,
         metadata_json=metadata or {},
         timestamp=datetime.utcnow(),
     )
+
+    if not durable and AUDIT_LOG_MODE != "sync":
+        if audit_sink.enqueue({
+            "id": entry.id,
+            "user_id": entry.user_id,
+            "action_type": entry.action_type,
+            "metadata_json": entry.metadata_json,
+            "timestamp": entry.timestamp,
+        }):
+            return entry
+
     db.add(entry)
-    db.commit()
-    db.refresh(entry)
+    await db.commit()
     return entry
+
+
+def audit_insert_from(
+    source,
+    *,
+    user_id: uuid.UUID,
+    action_type: str,
+    metadata: dict | None = None,
+):
+    """INSERT one audit row per row of ``source`` (typically a CTE wrapping
+    an INSERT ... RETURNING), so a write and its audit entry go to the
+    database as a single statement in the caller's transaction."""
+    return insert(models.AuditLog).from_select(
+        ["id", "user_id", "action_type", "metadata_json", "timestamp"],
+        select(
+            func.gen_random_uuid(),
+            literal(user_id, UUID(as_uuid=True)),
+            literal(action_type),
+            literal(metadata or {}, JSON),
+            literal(datetime.utcnow()),
+        ).select_from(source),
+    )
@@ -0,0 +1,171 @@
+"""Monthly range partitions for ``audit_logs``.
+
+Every month of audit rows lives in its own partition named
+``audit_logs_yYYYYmMM``. New months are created ahead of time, and expired
+months are detached (and normally dropped) as a metadata-only operation
+instead of a long DELETE.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .. import models
+
+logger = logging.getLogger(__name__)
+
+AUDIT_PARTITION_MONTHS_AHEAD = int(os.getenv("AUDIT_PARTITION_MONTHS_AHEAD", 3))
+# 0 keeps audit history forever.
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", 0))
+# "drop" removes expired partitions; "detach" leaves them as standalone
+# tables for archiving.
+AUDIT_RETENTION_ACTION = os.getenv("AUDIT_RETENTION_ACTION", "drop").strip().lower()
+AUDIT_MAINTENANCE_INTERVAL_HOURS = float(os.getenv("AUDIT_MAINTENANCE_INTERVAL_HOURS", 12))
+
+# Serializes partition DDL across workers.
+_MAINTENANCE_LOCK_ID = 7_203_118_001
+
+_PARTITION_NAME = re.compile(r"^audit_logs_y(\d{4})m(\d{2})$")
+
+
+def _month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"audit_logs_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('audit_logs')")
+    ).scalar()
+    return relkind == "p"
+
+
+def list_partitions(conn: Connection) -> list[date]:
+    names = conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass('audit_logs')"
+        )
+    ).scalars()
+    months = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partition(conn: Connection, month: date) -> None:
+    conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} "
+            f"PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+    )
+
+
+def ensure_partitions(
+    conn: Connection,
+    *,
+    months_ahead: int = AUDIT_PARTITION_MONTHS_AHEAD,
+    since: date | None = None,
+) -> None:
+    """Create monthly partitions from ``since`` (default: this month) up to
+    ``months_ahead`` months from now."""
+    today = _month_start(datetime.utcnow())
+    month = _month_start(since) if since else today
+    last = _add_months(today, max(0, months_ahead))
+    while month <= last:
+        create_partition(conn, month)
+        month = _add_months(month, 1)
+
+
+def apply_retention(
+    conn: Connection,
+    *,
+    retention_months: int = AUDIT_RETENTION_MONTHS,
+    action: str = AUDIT_RETENTION_ACTION,
+) -> list[str]:
+    """Detach (and unless ``action == "detach"``, drop) every partition that
+    ends before the retention window. Returns the affected partition names."""
+    if retention_months <= 0:
+        return []
+    cutoff = _add_months(_month_start(datetime.utcnow()), -retention_months)
+    expired = [month for month in list_partitions(conn) if _add_months(month, 1) <= cutoff]
+    names = []
+    for month in expired:
+        name = partition_name(month)
+        conn.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+        if action != "detach":
+            conn.execute(text(f"DROP TABLE {name}"))
+        names.append(name)
+    if names:
+        logger.info("Audit retention (%s): %s", action, ", ".join(names))
+    return names
+
+
+def convert_to_partitioned(conn: Connection) -> None:
+    """Rebuild a plain ``audit_logs`` table as the partitioned one.
+
+    No-op once the table is partitioned. Existing rows are copied into
+    monthly partitions covering their whole time range.
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _MAINTENANCE_LOCK_ID})
+    if is_partitioned(conn):
+        return
+
+    conn.execute(text("ALTER TABLE audit_logs RENAME TO audit_logs_legacy"))
+    conn.execute(text("ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey"))
+    for index in ("ix_audit_logs_user_id", "ix_audit_logs_action_type", "ix_audit_logs_timestamp"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+    models.AuditLog.__table__.create(bind=conn)
+
+    oldest = conn.execute(text("SELECT min(timestamp) FROM audit_logs_legacy")).scalar()
+    ensure_partitions(conn, since=oldest)
+    conn.execute(
+        text(
+            "INSERT INTO audit_logs (id, user_id, action_type, metadata_json, timestamp) "
+            "SELECT id, user_id, action_type, metadata_json, timestamp FROM audit_logs_legacy"
+        )
+    )
+    conn.execute(text("DROP TABLE audit_logs_legacy"))
+
+
+def run_maintenance(conn: Connection) -> list[str]:
+    conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _MAINTENANCE_LOCK_ID})
+    ensure_partitions(conn)
+    return apply_retention(conn)
+
+
+async def maintenance_loop(async_engine) -> None:
+    """Keep future partitions in place and apply retention, forever.
+
+    Startup already ran a pass, so this one waits first.
+    """
+    while True:
+        await asyncio.sleep(AUDIT_MAINTENANCE_INTERVAL_HOURS * 3600)
+        try:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(run_maintenance)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Audit partition maintenance failed")
@@ -0,0 +1,129 @@
+import uuid
+
+from sqlalchemy import case, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+
+_LAST_MESSAGE_COLUMNS = ("last_message_id", "last_message", "last_sender_id", "last_message_at")
+
+# Rebuilds the read model from messages; used by the migration and at startup.
+BACKFILL_CONVERSATIONS_SQL = """
+INSERT INTO conversations
+    (user_id, other_user_id, last_message_id, last_message, last_sender_id,
+     last_message_at, unread_count)
+SELECT
+    latest.user_id,
+    latest.other_user_id,
+    latest.id,
+    latest.content,
+    latest.sender_id,
+    latest.created_at,
+    coalesce(unread.unread_count, 0)
+FROM (
+    SELECT DISTINCT ON (side.user_id, side.other_user_id)
+        side.user_id,
+        side.other_user_id,
+        m.id,
+        m.content,
+        m.sender_id,
+        m.created_at
+    FROM messages m
+    CROSS JOIN LATERAL (
+        VALUES (m.sender_id, m.receiver_id), (m.receiver_id, m.sender_id)
+    ) AS side(user_id, other_user_id)
+    ORDER BY side.user_id, side.other_user_id, m.created_at DESC, m.id DESC
+) AS latest
+LEFT JOIN (
+    -- Counted once per pair, not once per message row.
+    SELECT receiver_id AS user_id, sender_id AS other_user_id, count(*) AS unread_count
+    FROM messages
+    WHERE is_read = FALSE
+    GROUP BY 1, 2
+) AS unread
+    ON unread.user_id = latest.user_id
+   AND unread.other_user_id = latest.other_user_id
+ON CONFLICT (user_id, other_user_id) DO NOTHING
+"""
+
+
+async def record_messages(db: AsyncSession, messages: list[models.Message]) -> None:
+    """Fold flushed messages into both participants' conversation rows.
+
+    Runs in the caller's transaction. A row only takes the new message as
+    its last message when it is not older than the one already stored, so
+    out-of-order commits cannot move the preview backwards.
+    """
+    if not messages:
+        return
+
+    # One row per (user, partner): ON CONFLICT cannot touch a row twice.
+    rows: dict[tuple[uuid.UUID, uuid.UUID], dict] = {}
+    for message in messages:
+        last = {
+            "last_message_id": message.id,
+            "last_message": message.content,
+            "last_sender_id": message.sender_id,
+            "last_message_at": message.created_at,
+        }
+        for user_id, other_user_id, unread in (
+            (message.sender_id, message.receiver_id, 0),
+            (message.receiver_id, message.sender_id, 1),
+        ):
+            row = rows.get((user_id, other_user_id))
+            if row is None:
+                rows[(user_id, other_user_id)] = {
+                    "user_id": user_id,
+                    "other_user_id": other_user_id,
+                    "unread_count": unread,
+                    **last,
+                }
+                continue
+            row["unread_count"] += unread
+            if message.created_at >= row["last_message_at"]:
+                row.update(last)
+
+    # Same key order in every transaction: concurrent A->B and B->A batches
+    # would otherwise lock the pair's two rows in opposite order and deadlock.
+    stmt = insert(models.Conversation).values([rows[key] for key in sorted(rows)])
+    is_newer = stmt.excluded.last_message_at >= models.Conversation.last_message_at
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Conversation.user_id, models.Conversation.other_user_id],
+        set_={
+            **{
+                column: case(
+                    (is_newer, getattr(stmt.excluded, column)),
+                    else_=getattr(models.Conversation, column),
+                )
+                for column in _LAST_MESSAGE_COLUMNS
+            },
+            "unread_count": models.Conversation.unread_count + stmt.excluded.unread_count,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def mark_conversation_read(
+    db: AsyncSession,
+    *,
+    user_id: uuid.UUID,
+    other_user_id: uuid.UUID,
+    read_count: int,
+) -> None:
+    """Take ``read_count`` messages just marked read off the unread count.
+
+    Not reset to zero: a message committed after the read UPDATE is still
+    unread and must stay counted.
+    """
+    if not read_count:
+        return
+    await db.execute(
+        update(models.Conversation)
+        .where(
+            models.Conversation.user_id == user_id,
+            models.Conversation.other_user_id == other_user_id,
+        )
+        .values(unread_count=func.greatest(models.Conversation.unread_count - read_count, 0))
+        .execution_options(synchronize_session=False)
+    )
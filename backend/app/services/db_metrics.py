@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram buckets.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def observe_wait(self, seconds: float) -> None:
+        index = len(WAIT_BUCKETS)
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if seconds <= bound:
+                index = i
+                break
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.wait_buckets[index] += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            buckets = list(self.wait_buckets)
+            checkouts = self.checkouts
+            timeouts = self.timeouts
+            wait_total = self.wait_total
+            wait_max = self.wait_max
+
+        labels = [str(bound) for bound in WAIT_BUCKETS] + ["+Inf"]
+        return {
+            "pool": self.name,
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkouts_total": checkouts,
+            "timeouts_total": timeouts,
+            "wait_seconds_total": round(wait_total, 6),
+            "wait_seconds_max": round(wait_max, 6),
+            "wait_seconds_buckets": dict(zip(labels, buckets)),
+        }
+
+
+class _MeteredPoolMixin:
+    """Times how long callers wait for a connection and counts pool timeouts."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.observe_wait(time.perf_counter() - started)
+        return connection
+
+
+def metered_pool_class(base: type, metrics: PoolMetrics) -> type:
+    return type(
+        f"Metered{base.__name__}",
+        (_MeteredPoolMixin, base),
+        {"metrics": metrics},
+    )
+
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+MeteredQueuePool = metered_pool_class(QueuePool, sync_pool_metrics)
+MeteredAsyncQueuePool = metered_pool_class(AsyncAdaptedQueuePool, async_pool_metrics)
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable
+
+from .frames import EncodedFrame, dumps_json
+
+logger = logging.getLogger(__name__)
+
+# An envelope is {"user_id": ..., "message": {...}} for a single recipient,
+# {"presence": True, "worker": ..., "user_id": ..., "status": ...,
+# "recipients": [...]}, {"presence_snapshot": True, "worker": ...,
+# "user_ids": [...]} / {"presence_sync": True, "worker": ...} between
+# workers, {"block": True, "user_ids": [a, b]} when a pair stops being
+# able to chat, or {"principal": True, "user_ids": [...]} when cached
+# principals go stale.
+Deliver = Callable[[dict], Awaitable[None]]
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+NOTIFY_PAYLOAD_LIMIT = 7900
+# Room left in each part for its header line.
+_PART_HEADER_ROOM = 200
+# Envelopes waiting for the publisher, and how many it sends per transaction.
+CHAT_FANOUT_QUEUE_SIZE = int(os.getenv("CHAT_FANOUT_QUEUE_SIZE", 10000))
+CHAT_FANOUT_BATCH_SIZE = int(os.getenv("CHAT_FANOUT_BATCH_SIZE", 500))
+CHAT_FANOUT_PUBLISH_TIMEOUT_SECONDS = float(os.getenv("CHAT_FANOUT_PUBLISH_TIMEOUT_SECONDS", 5))
+# Incomplete split envelopes kept per worker (only a listener reconnect
+# mid-envelope leaves one behind).
+_MAX_PENDING_PARTS = 64
+
+
+def _split_utf8(data: bytes, size: int) -> list[str]:
+    pieces = []
+    start = 0
+    while start < len(data):
+        end = min(start + size, len(data))
+        # Never cut through a multi-byte character.
+        while end < len(data) and data[end] & 0xC0 == 0x80:
+            end -= 1
+        pieces.append(data[start:end].decode("utf-8"))
+        start = end
+    return pieces
+
+
+class FanoutBackend(ABC):
+    @abstractmethod
+    async def start(self, deliver: Deliver) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stop(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def publish(self, envelope: dict) -> None:
+        raise NotImplementedError
+
+
+class InProcessFanout(FanoutBackend):
+    """Delivers only to sockets held by this process."""
+
+    def __init__(self):
+        self._deliver: Deliver | None = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    async def publish(self, envelope: dict) -> None:
+        if self._deliver is not None:
+            await self._deliver(envelope)
+
+
+class PostgresFanout(FanoutBackend):
+    """Relays envelopes between workers with Postgres LISTEN/NOTIFY.
+
+    Envelopes are delivered to local sockets straight away and then
+    published on ``channel``; every other worker listening on the channel
+    delivers them to its own sockets. Each worker tags what it publishes so
+    it can ignore its own notifications.
+
+    Envelopes too large for one NOTIFY are split into parts sent in a
+    single transaction, so listeners get all of them, in order, together;
+    each part is a JSON header line followed by a slice of the envelope.
+
+    ``publish`` never waits on Postgres: envelopes are queued for a single
+    publisher task, which sends whatever has queued up with one pipelined
+    transaction under a timeout. One connection keeps a worker's envelopes
+    in order, and a slow NOTIFY holds up only the queue, not the sockets.
+    """
+
+    def __init__(self, dsn: str, channel: str, reconnect_delay: float = 1.0):
+        self._dsn = dsn
+        self._channel = channel
+        self._reconnect_delay = reconnect_delay
+        self._origin = uuid.uuid4().hex
+        self._deliver: Deliver | None = None
+        self._listen_conn = None
+        self._publish_conn = None
+        self._queue: asyncio.Queue[list[str]] = asyncio.Queue(maxsize=CHAT_FANOUT_QUEUE_SIZE)
+        self._publisher: asyncio.Task | None = None
+        self._runner: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._parts: dict[tuple[str, str], list[str]] = {}
+        self.metrics = {"published": 0, "batches": 0, "overflow": 0, "failed": 0}
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._runner = asyncio.create_task(self._listen_forever())
+        self._publisher = asyncio.create_task(self._publish_forever())
+
+    async def stop(self) -> None:
+        if self._publisher is not None:
+            # Give what is already queued one last chance to go out.
+            try:
+                async with asyncio.timeout(CHAT_FANOUT_PUBLISH_TIMEOUT_SECONDS):
+                    await self._queue.join()
+            except TimeoutError:
+                logger.error("Chat fan-out stopped with %d envelopes unsent", self._queue.qsize())
+            self._publisher.cancel()
+            try:
+                await self._publisher
+            except asyncio.CancelledError:
+                pass
+            self._publisher = None
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        for conn in (self._listen_conn, self._publish_conn):
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        self._listen_conn = None
+        self._publish_conn = None
+        self._deliver = None
+
+    async def publish(self, envelope: dict) -> None:
+        if self._deliver is not None:
+            await self._deliver(envelope)
+
+        message = envelope.get("message")
+        if isinstance(message, EncodedFrame):
+            envelope = {**envelope, "message": message.message}
+        payload = dumps_json({"origin": self._origin, **envelope})
+        data = payload.encode("utf-8")
+        if len(data) <= NOTIFY_PAYLOAD_LIMIT:
+            payloads = [payload]
+        else:
+            pieces = _split_utf8(data, NOTIFY_PAYLOAD_LIMIT - _PART_HEADER_ROOM)
+            part_id = uuid.uuid4().hex
+            payloads = [
+                dumps_json({"origin": self._origin, "part": part_id, "seq": seq, "total": len(pieces)})
+                + "\n" + piece
+                for seq, piece in enumerate(pieces)
+            ]
+
+        try:
+            self._queue.put_nowait(payloads)
+        except asyncio.QueueFull:
+            self.metrics["overflow"] += 1
+            logger.error("Chat fan-out queue full; envelope delivered locally only")
+
+    async def _publish_forever(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty() and len(batch) < CHAT_FANOUT_BATCH_SIZE:
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._notify(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _notify(self, batch: list[list[str]]) -> None:
+        args = [(self._channel, payload) for payloads in batch for payload in payloads]
+        # One retry on a fresh connection, then the batch is reported lost.
+        for attempt in (1, 2):
+            try:
+                async with asyncio.timeout(CHAT_FANOUT_PUBLISH_TIMEOUT_SECONDS):
+                    conn = await self._publish_connection()
+                    async with conn.transaction():
+                        await conn.executemany("SELECT pg_notify($1, $2)", args)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Chat fan-out NOTIFY of %d envelopes failed (attempt %d)", len(batch), attempt)
+                if self._publish_conn is not None:
+                    self._publish_conn.terminate()
+                self._publish_conn = None
+                continue
+            self.metrics["published"] += len(batch)
+            self.metrics["batches"] += 1
+            return
+        self.metrics["failed"] += len(batch)
+        logger.error("Chat fan-out lost %d envelopes; delivered locally only", len(batch))
+
+    async def _publish_connection(self):
+        import asyncpg
+
+        if self._publish_conn is None or self._publish_conn.is_closed():
+            self._publish_conn = await asyncpg.connect(self._dsn)
+        return self._publish_conn
+
+    async def _listen_forever(self) -> None:
+        import asyncpg
+
+        while True:
+            closed = asyncio.Event()
+            try:
+                self._listen_conn = await asyncpg.connect(self._dsn)
+                self._listen_conn.add_termination_listener(lambda _conn: closed.set())
+                await self._listen_conn.add_listener(self._channel, self._on_notify)
+                await closed.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Chat fan-out listener failed; reconnecting")
+            await asyncio.sleep(self._reconnect_delay)
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        header, newline, piece = payload.partition("\n")
+        if newline:
+            payload = self._reassemble(header, piece)
+            if payload is None:
+                return
+        try:
+            envelope = json.loads(payload)
+        except ValueError:
+            return
+        if envelope.pop("origin", None) == self._origin or self._deliver is None:
+            return
+        task = asyncio.create_task(self._deliver(envelope))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _reassemble(self, header: str, piece: str) -> str | None:
+        try:
+            part = json.loads(header)
+        except ValueError:
+            return None
+        if part.get("origin") == self._origin:
+            return None
+        key = (part["origin"], part["part"])
+        if part["seq"] == 0:
+            if len(self._parts) >= _MAX_PENDING_PARTS:
+                self._parts.pop(next(iter(self._parts)))
+            self._parts[key] = []
+        pieces = self._parts.get(key)
+        if pieces is None or len(pieces) != part["seq"]:
+            # A part went missing (listener reconnected mid-envelope).
+            self._parts.pop(key, None)
+            logger.error("Incomplete chat fan-out envelope %s discarded", part["part"])
+            return None
+        pieces.append(piece)
+        if len(pieces) < part["total"]:
+            return None
+        del self._parts[key]
+        return "".join(pieces)
+
+
+class FanoutBackendFactory:
+    @staticmethod
+    def create() -> FanoutBackend:
+        backend = os.getenv("CHAT_FANOUT_BACKEND", "memory").strip().lower()
+
+        if backend == "postgres":
+            from sqlalchemy.engine import make_url
+
+            from ..database import ASYNC_DATABASE_URL
+
+            dsn = make_url(ASYNC_DATABASE_URL).set(drivername="postgresql")
+            return PostgresFanout(
+                dsn.render_as_string(hide_password=False),
+                channel=os.getenv("CHAT_FANOUT_CHANNEL", "chat_fanout"),
+            )
+
+        return InProcessFanout()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+
+def supported_encodings() -> set[str]:
+    return {JSON, MSGPACK} if msgpack is not None else {JSON}
+
+
+def _default(value):
+    # Datetimes as ISO 8601 like orjson and FastAPI; UUIDs and the rest as str.
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps_json(message) -> str:
+    if orjson is not None:
+        return orjson.dumps(message, default=_default).decode("utf-8")
+    return json.dumps(message, default=_default)
+
+
+class EncodedFrame:
+    """An outbound websocket frame, serialized at most once per encoding.
+
+    JSON frames are sent as text and MessagePack frames as binary, so the
+    same object can be queued for every socket of every recipient.
+    """
+
+    __slots__ = ("message", "_json", "_msgpack")
+
+    def __init__(self, message: dict):
+        self.message = message
+        self._json: str | None = None
+        self._msgpack: bytes | None = None
+
+    def json(self) -> str:
+        if self._json is None:
+            self._json = dumps_json(self.message)
+        return self._json
+
+    def msgpack(self) -> bytes:
+        if self._msgpack is None:
+            self._msgpack = msgpack.packb(self.message, default=_default)
+        return self._msgpack
+
+    def encode(self, encoding: str) -> str | bytes:
+        if encoding == MSGPACK:
+            return self.msgpack()
+        return self.json()
+
+
+def decode_inbound(frame: dict, encoding: str) -> dict:
+    """Decode a received ASGI websocket message into a chat payload."""
+    if frame.get("bytes") is not None:
+        if encoding != MSGPACK:
+            raise ValueError("Binary frames require msgpack encoding")
+        return msgpack.unpackb(frame["bytes"])
+    return json.loads(frame.get("text") or "")
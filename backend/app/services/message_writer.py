@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .. import models
+from .conversations import record_messages
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MessageBatchWriter:
+    """Group commit for chat messages.
+
+    ``submit`` queues a message and waits for it to be durable. A single
+    runner takes whatever has queued up, waits at most ``max_delay_seconds``
+    for more (up to ``max_rows``), and writes the batch with one multi-row
+    INSERT ... RETURNING, one conversations upsert and one commit. While a
+    batch is being committed the next one accumulates, so batches grow with
+    load instead of every message paying for its own commit.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        max_rows: int,
+        max_delay_seconds: float,
+    ):
+        self._session_factory = session_factory
+        self._max_rows = max(1, max_rows)
+        self._max_delay_seconds = max_delay_seconds
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._runner: asyncio.Task | None = None
+        self.metrics = {"batches": 0, "messages": 0, "largest_batch": 0, "failed_batches": 0}
+
+    async def start(self) -> None:
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Flush what is already queued before shutting down.
+        if self._runner is None:
+            return
+        self._queue.put_nowait(_STOP)
+        await self._runner
+        self._runner = None
+
+    async def submit(
+        self,
+        *,
+        sender_id: uuid.UUID,
+        receiver_id: uuid.UUID,
+        content: str,
+        status: str,
+    ) -> models.Message:
+        if self._runner is None:
+            raise RuntimeError("Message writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((
+            {
+                "id": uuid.uuid4(),
+                "sender_id": sender_id,
+                "receiver_id": receiver_id,
+                "content": content,
+                # Stamped on arrival so a batch keeps the order it was received in.
+                "created_at": datetime.utcnow(),
+                "status": status,
+            },
+            future,
+        ))
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self._max_delay_seconds
+            while len(batch) < self._max_rows:
+                try:
+                    if self._queue.empty():
+                        async with asyncio.timeout_at(deadline):
+                            item = await self._queue.get()
+                    else:
+                        item = self._queue.get_nowait()
+                except TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._write(batch)
+
+    async def _write(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        try:
+            messages = await self._insert([row for row, _ in batch])
+        except Exception:
+            # One bad row (e.g. a receiver deleted mid-flight) must not fail
+            # its neighbours: retry the batch one message at a time.
+            self.metrics["failed_batches"] += 1
+            logger.exception("Chat message batch of %d failed; retrying individually", len(batch))
+            for row, future in batch:
+                try:
+                    (message,) = await self._insert([row])
+                except Exception as exc:
+                    if not future.done():
+                        future.set_exception(exc)
+                else:
+                    if not future.done():
+                        future.set_result(message)
+            return
+
+        self.metrics["batches"] += 1
+        self.metrics["messages"] += len(batch)
+        self.metrics["largest_batch"] = max(self.metrics["largest_batch"], len(batch))
+        for (_, future), message in zip(batch, messages):
+            if not future.done():
+                future.set_result(message)
+
+    async def _insert(self, rows: list[dict]) -> list[models.Message]:
+        async with self._session_factory() as db:
+            messages = list(await db.scalars(
+                insert(models.Message).returning(models.Message, sort_by_parameter_order=True),
+                rows,
+            ))
+            await record_messages(db, messages)
+            await db.commit()
+            return messages
@@ -0,0 +1,96 @@
+"""bcrypt hashing on a dedicated process pool.
+
+bcrypt is deliberately slow (~250 ms at cost 12). Running it on the event
+loop stalls every request and websocket on the worker, and an unbounded
+thread pool only moves the pile-up elsewhere. Work goes to a small process
+pool instead, and callers are turned away with PasswordHasherBusy once
+``PASSWORD_HASH_MAX_PENDING`` operations are already queued or running.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = max(1, int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 8))
+
+# Hashes made with a different cost report needs_update, which drives
+# rehash-on-login when BCRYPT_ROUNDS changes.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class PasswordHasherBusy(RuntimeError):
+    pass
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(password, hashed)
+
+
+class PasswordHasher:
+    def __init__(self, *, workers: int, max_pending: int):
+        self._workers = workers
+        self._max_pending = max_pending
+        self._pending = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self.metrics = {"rejected": 0, "rehashed": 0}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the parent has an event loop and DB pools.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self._max_pending:
+            self.metrics["rejected"] += 1
+            raise PasswordHasherBusy("Too many password operations in flight")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """Return ``(valid, new_hash)``; ``new_hash`` is set when the stored
+        hash should be replaced because the configured cost changed."""
+        valid, new_hash = await self._run(_verify_and_update, password, hashed)
+        if new_hash is not None:
+            self.metrics["rehashed"] += 1
+        return valid, new_hash
+
+    def snapshot(self) -> dict:
+        return {
+            "workers": self._workers,
+            "max_pending": self._max_pending,
+            "pending": self._pending,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            **self.metrics,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from typing import Awaitable, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+ONLINE = "online"
+OFFLINE = "offline"
+
+Publish = Callable[[dict], Awaitable[None]]
+ContactsLoader = Callable[[str], Awaitable[Iterable[str]]]
+# notify(user_id, status, contacts) sends a status frame to whichever of
+# ``contacts`` are connected to this worker.
+Notify = Callable[[str, str, list[str]], Awaitable[None]]
+
+
+class PresenceTracker:
+    """Coalesced, contact-scoped online/offline tracking across workers.
+
+    Connect and disconnect only record the wanted state. After
+    ``coalesce_seconds`` this worker publishes whether it still holds a
+    socket for the user, once, and only if that changed, so a flapping
+    connection costs nothing. Every worker applies every published change
+    through ``observe`` and keeps, per user, the set of workers holding them;
+    a user is online while any worker does, so losing one of several sockets
+    on different workers is not an offline. Status frames go only to
+    contacts that are currently online, and only when the user's overall
+    status actually flips.
+
+    A starting worker asks the others for their online users, and every
+    worker re-announces its own every ``heartbeat_seconds``. Workers not heard
+    from for three heartbeats are forgotten along with their users. When a
+    snapshot or an expiry flips a user's overall status, every worker
+    notifies its own sockets of that user's contacts through ``notify``,
+    after the same coalescing window.
+    """
+
+    def __init__(
+        self,
+        *,
+        publish: Publish,
+        load_contacts: ContactsLoader,
+        notify: Notify,
+        coalesce_seconds: float,
+        heartbeat_seconds: float,
+    ):
+        self._publish = publish
+        self._load_contacts = load_contacts
+        self._notify = notify
+        self._coalesce_seconds = coalesce_seconds
+        self._heartbeat_seconds = heartbeat_seconds
+        self.worker_id = uuid.uuid4().hex
+        # { user_id: {worker_id, ...} } for every user online somewhere.
+        self._workers: dict[str, set[str]] = {}
+        # { worker_id: {user_id, ...} }, the same data indexed the other way.
+        self._users: dict[str, set[str]] = {}
+        self._last_seen: dict[str, float] = {}
+        self._wanted: dict[str, str] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+        # Users whose overall status flipped without a presence envelope,
+        # with whether they were online before the first flip.
+        self._flipped: dict[str, bool] = {}
+        self._notifying: dict[str, asyncio.Task] = {}
+        self._heartbeat: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._heartbeat_forever())
+
+    def mark(self, user_id: str, status: str) -> None:
+        self._wanted[user_id] = status
+        if user_id not in self._pending:
+            self._pending[user_id] = asyncio.create_task(self._flush_later(user_id))
+
+    def observe(self, worker_id: str, user_id: str, status: str) -> bool:
+        """Apply one worker's change; True when the user's overall status flipped."""
+        self._touch(worker_id)
+        was_online = self.is_online(user_id)
+        if status == ONLINE:
+            self._workers.setdefault(user_id, set()).add(worker_id)
+            self._users.setdefault(worker_id, set()).add(user_id)
+        else:
+            self._drop(worker_id, user_id)
+        return was_online != self.is_online(user_id)
+
+    def observe_snapshot(self, worker_id: str, user_ids: Iterable[str]) -> None:
+        """Replace everything known about ``worker_id`` with its own list."""
+        self._touch(worker_id)
+        if worker_id == self.worker_id:
+            return
+        user_ids = set(user_ids)
+        known = self._users.get(worker_id, set())
+        was_online = {uid: self.is_online(uid) for uid in known ^ user_ids}
+        for user_id in known - user_ids:
+            self._drop(worker_id, user_id)
+        for user_id in user_ids:
+            self._workers.setdefault(user_id, set()).add(worker_id)
+        if user_ids:
+            self._users[worker_id] = user_ids
+        for user_id, was in was_online.items():
+            self._note_flip(user_id, was)
+
+    async def announce(self) -> None:
+        await self._publish({
+            "presence_snapshot": True,
+            "worker": self.worker_id,
+            "user_ids": sorted(self._users.get(self.worker_id, ())),
+        })
+
+    def is_online(self, user_id: str) -> bool:
+        return bool(self._workers.get(user_id))
+
+    def statuses(self, user_ids: Iterable[str]) -> dict[str, str]:
+        return {uid: ONLINE if self.is_online(uid) else OFFLINE for uid in user_ids}
+
+    async def stop(self) -> None:
+        tasks = [*self._pending.values(), *self._notifying.values()]
+        if self._heartbeat is not None:
+            tasks.append(self._heartbeat)
+            self._heartbeat = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending.clear()
+        self._wanted.clear()
+        self._notifying.clear()
+        self._flipped.clear()
+        # Let the other workers forget this one's users straight away.
+        for user_id in list(self._users.get(self.worker_id, ())):
+            self._drop(self.worker_id, user_id)
+        try:
+            await self.announce()
+        except Exception:
+            logger.exception("Could not withdraw presence for worker %s", self.worker_id)
+
+    def _touch(self, worker_id: str) -> None:
+        self._last_seen[worker_id] = asyncio.get_running_loop().time()
+
+    def _drop(self, worker_id: str, user_id: str) -> None:
+        workers = self._workers.get(user_id)
+        if workers is not None:
+            workers.discard(worker_id)
+            if not workers:
+                del self._workers[user_id]
+        users = self._users.get(worker_id)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del self._users[worker_id]
+
+    def _expire(self) -> None:
+        cutoff = asyncio.get_running_loop().time() - 3 * self._heartbeat_seconds
+        for worker_id, seen in list(self._last_seen.items()):
+            if worker_id != self.worker_id and seen < cutoff:
+                logger.warning("Chat worker %s went silent; forgetting its users", worker_id)
+                del self._last_seen[worker_id]
+                for user_id in list(self._users.get(worker_id, ())):
+                    was = self.is_online(user_id)
+                    self._drop(worker_id, user_id)
+                    self._note_flip(user_id, was)
+
+    def _note_flip(self, user_id: str, was_online: bool) -> None:
+        if was_online == self.is_online(user_id) or user_id in self._flipped:
+            return
+        self._flipped[user_id] = was_online
+        self._notifying[user_id] = asyncio.create_task(self._notify_later(user_id))
+
+    async def _notify_later(self, user_id: str) -> None:
+        try:
+            await asyncio.sleep(self._coalesce_seconds)
+        finally:
+            self._notifying.pop(user_id, None)
+        was_online = self._flipped.pop(user_id, None)
+        if was_online is None or was_online == self.is_online(user_id):
+            return
+
+        try:
+            contacts = await self._load_contacts(user_id)
+        except Exception:
+            logger.exception("Could not load presence contacts for %s", user_id)
+            return
+        status = ONLINE if self.is_online(user_id) else OFFLINE
+        await self._notify(user_id, status, [uid for uid in contacts if self.is_online(uid)])
+
+    async def _heartbeat_forever(self) -> None:
+        # Every worker answers a sync request with its own snapshot.
+        try:
+            await self._publish({"presence_sync": True, "worker": self.worker_id})
+        except Exception:
+            logger.exception("Could not request presence from other workers")
+        while True:
+            await asyncio.sleep(self._heartbeat_seconds)
+            self._expire()
+            try:
+                await self.announce()
+            except Exception:
+                logger.exception("Could not announce presence for worker %s", self.worker_id)
+
+    async def _flush_later(self, user_id: str) -> None:
+        try:
+            await asyncio.sleep(self._coalesce_seconds)
+        finally:
+            self._pending.pop(user_id, None)
+        status = self._wanted.pop(user_id, None)
+        held_here = user_id in self._users.get(self.worker_id, ())
+        if status is None or (status == ONLINE) == held_here:
+            return
+
+        try:
+            contacts = await self._load_contacts(user_id)
+        except Exception:
+            logger.exception("Could not load presence contacts for %s", user_id)
+            contacts = []
+
+        await self._publish({
+            "presence": True,
+            "worker": self.worker_id,
+            "user_id": user_id,
+            "status": status,
+            "recipients": [uid for uid in contacts if self.is_online(uid)],
+        })
@@ -0,0 +1,57 @@
+"""Create upcoming audit_logs partitions and apply the retention policy.
+
+The API does this on startup and every AUDIT_MAINTENANCE_INTERVAL_HOURS; run
+this from cron when retention should not depend on the API being up.
+
+Usage (from ``backend/``):
+
+    python -m scripts.audit_retention --retention-months 24
+    python -m scripts.audit_retention --retention-months 24 --detach-only
+
+Expired partitions are detached and dropped. With ``--detach-only`` they are
+left as standalone ``audit_logs_yYYYYmMM`` tables for archiving.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from app.database import engine
+from app.services import audit_partitions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=audit_partitions.AUDIT_RETENTION_MONTHS,
+        help="Months of audit history to keep; 0 keeps everything",
+    )
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=audit_partitions.AUDIT_PARTITION_MONTHS_AHEAD,
+    )
+    parser.add_argument("--detach-only", action="store_true")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        audit_partitions.convert_to_partitioned(conn)
+        audit_partitions.ensure_partitions(conn, months_ahead=args.months_ahead)
+        expired = audit_partitions.apply_retention(
+            conn,
+            retention_months=args.retention_months,
+            action="detach" if args.detach_only else "drop",
+        )
+        partitions = ", ".join(
+            audit_partitions.partition_name(month)
+            for month in audit_partitions.list_partitions(conn)
+        )
+
+    print(f"Partitions: {partitions or 'none'}")
+    print(f"Expired: {', '.join(expired) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Benchmark the nearby-donor search against a synthetic users table.
+
+Builds ``donor_bench.users`` with the same columns the search touches, fills
+it with ``--rows`` synthetic users spread around a city centre, and runs the
+donor search first with only the full ``GIST (location)`` index and then with
+the partial ``GIST (donation_type, location)`` index from migration
+``20261017_01_donor_search_index``. For each phase it prints the EXPLAIN plan
+and latency percentiles.
+
+Usage (from ``backend/``):
+
+    python -m scripts.benchmark_donor_search --rows 1000000
+
+The schema is dropped at the end unless ``--keep`` is given.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+SCHEMA = "donor_bench"
+
+ORGAN_TYPES = ("blood", "kidney", "liver", "heart", "cornea", "bone_marrow")
+
+SEARCH_SQL = """
+SELECT
+    id,
+    name,
+    ST_Y(location::geometry) AS latitude,
+    ST_X(location::geometry) AS longitude
+FROM users
+WHERE role = 'donor'
+  AND donation_type = :organ_type
+  AND available = TRUE
+  AND is_verified_donor = TRUE
+  AND verification_status = 'approved'
+  AND ST_DWithin(
+        location,
+        ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography,
+        :radius
+    )
+ORDER BY location <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography
+LIMIT 50
+"""
+
+
+def _build_table(conn, rows: int, center_lat: float, center_lon: float, spread: float) -> None:
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+    conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.users (
+            id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+            name varchar NOT NULL,
+            role varchar NOT NULL,
+            donation_type varchar,
+            available boolean DEFAULT TRUE,
+            is_verified_donor boolean NOT NULL DEFAULT FALSE,
+            verification_status varchar NOT NULL DEFAULT 'pending',
+            location geography(POINT, 4326)
+        )
+    """))
+    # Roughly 60% donors, of which most are approved and available.
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.users
+            (name, role, donation_type, available, is_verified_donor,
+             verification_status, location)
+        SELECT
+            'user ' || g,
+            CASE WHEN r.role_roll < 0.6 THEN 'donor' ELSE 'seeker' END,
+            (ARRAY['blood','kidney','liver','heart','cornea','bone_marrow'])[1 + (g % 6)],
+            r.avail_roll < 0.8,
+            r.status_roll < 0.7,
+            CASE
+                WHEN r.status_roll < 0.7 THEN 'approved'
+                WHEN r.status_roll < 0.9 THEN 'pending'
+                ELSE 'rejected'
+            END,
+            ST_SetSRID(
+                ST_MakePoint(
+                    :lon + (random() - 0.5) * :spread,
+                    :lat + (random() - 0.5) * :spread
+                ),
+                4326
+            )::geography
+        FROM generate_series(1, :rows) AS g,
+        LATERAL (
+            SELECT random() AS role_roll, random() AS avail_roll, random() AS status_roll
+            WHERE g IS NOT NULL
+        ) AS r
+    """), {"rows": rows, "lat": center_lat, "lon": center_lon, "spread": spread})
+    conn.execute(text(
+        f"CREATE INDEX idx_users_location ON {SCHEMA}.users USING GIST (location)"
+    ))
+    conn.execute(text(f"ANALYZE {SCHEMA}.users"))
+
+
+def _add_partial_index(conn) -> None:
+    conn.execute(text(f"""
+        CREATE INDEX idx_users_searchable_donor_location
+        ON {SCHEMA}.users USING GIST (donation_type, location)
+        WHERE role = 'donor'
+          AND available = TRUE
+          AND is_verified_donor = TRUE
+          AND verification_status = 'approved'
+    """))
+    conn.execute(text(f"ANALYZE {SCHEMA}.users"))
+
+
+def _run_phase(conn, label: str, samples: list[dict]) -> list[float]:
+    conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+
+    plan = conn.execute(
+        text("EXPLAIN (ANALYZE, BUFFERS) " + SEARCH_SQL),
+        samples[0],
+    ).fetchall()
+    print(f"\n=== {label}: EXPLAIN ===")
+    for (line,) in plan:
+        print(line)
+
+    latencies = []
+    for params in samples:
+        started = time.perf_counter()
+        conn.execute(text(SEARCH_SQL), params).fetchall()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    conn.execute(text("RESET search_path"))
+    return latencies
+
+
+def _summary(latencies: list[float]) -> str:
+    ordered = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    return (
+        f"n={len(ordered)} mean={statistics.fmean(ordered):.2f}ms "
+        f"p50={pct(0.50):.2f}ms p95={pct(0.95):.2f}ms p99={pct(0.99):.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius-km", type=float, default=5)
+    parser.add_argument("--lat", type=float, default=12.9716)
+    parser.add_argument("--lon", type=float, default=77.5946)
+    parser.add_argument("--spread", type=float, default=1.0, help="Spread of synthetic points in degrees")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark schema afterwards")
+    args = parser.parse_args()
+
+    load_dotenv()
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise RuntimeError("DATABASE_URL is not set. Check your .env file.")
+
+    engine = create_engine(database_url)
+    rng = random.Random(42)
+    samples = [
+        {
+            "lat": args.lat + (rng.random() - 0.5) * args.spread,
+            "lon": args.lon + (rng.random() - 0.5) * args.spread,
+            "radius": args.radius_km * 1000,
+            "organ_type": rng.choice(ORGAN_TYPES),
+        }
+        for _ in range(args.queries)
+    ]
+
+    try:
+        with engine.begin() as conn:
+            print(f"Building {SCHEMA}.users with {args.rows} rows...")
+            _build_table(conn, args.rows, args.lat, args.lon, args.spread)
+
+        with engine.begin() as conn:
+            before = _run_phase(conn, "before (full GiST on location)", samples)
+
+        with engine.begin() as conn:
+            _add_partial_index(conn)
+
+        with engine.begin() as conn:
+            after = _run_phase(conn, "after (partial GiST on donation_type, location)", samples)
+
+        print("\n=== latency ===")
+        print(f"before: {_summary(before)}")
+        print(f"after:  {_summary(after)}")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Hundreds of chat websockets on a two-connection database pool.
+
+Open sockets must not hold pooled connections, so with DB_POOL_SIZE=2 and
+DB_MAX_OVERFLOW=0 every socket still connects and can exchange a message.
+
+Needs a disposable PostGIS database: set TEST_DATABASE_URL to its
+SQLAlchemy URL (postgresql+psycopg2://...). The app's startup migrations
+run against it.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if not TEST_DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+SOCKETS = int(os.getenv("CHAT_POOL_TEST_SOCKETS", 300))
+
+# The pool is sized when app.database is imported, so configure it first.
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ["DB_POOL_SIZE"] = "2"
+os.environ["DB_MAX_OVERFLOW"] = "0"
+os.environ["DB_POOL_TIMEOUT"] = "10"
+os.environ["CHAT_FANOUT_BACKEND"] = "memory"
+os.environ.setdefault("SECRET_KEY", "chat-pool-test")
+
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+from sqlalchemy import delete, or_  # noqa: E402
+
+from app import models  # noqa: E402
+from app.auth import create_access_token  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+def users():
+    ids = [uuid.uuid4() for _ in range(SOCKETS - SOCKETS % 2)]
+    with SessionLocal() as db:
+        db.add_all(
+            models.User(
+                id=user_id,
+                name=f"Chat pool {index}",
+                email=f"chat-pool-{user_id}@example.com",
+                password="x",
+                role="seeker",
+            )
+            for index, user_id in enumerate(ids)
+        )
+        db.commit()
+    try:
+        yield ids
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(models.Message).where(or_(
+                models.Message.sender_id.in_(ids),
+                models.Message.receiver_id.in_(ids),
+            )))
+            db.execute(delete(models.Conversation).where(models.Conversation.user_id.in_(ids)))
+            db.execute(delete(models.User).where(models.User.id.in_(ids)))
+            db.commit()
+
+
+@pytest.fixture
+def server_url():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", ws_ping_interval=None))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        assert thread.is_alive() and time.monotonic() < deadline, "server did not start"
+        time.sleep(0.05)
+    try:
+        yield f"ws://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=30)
+        sock.close()
+
+
+async def _receive_chat_message(ws, sender_id: str) -> dict:
+    # Skip status frames and the echo of our own message.
+    while True:
+        frame = json.loads(await ws.recv())
+        if frame.get("type") == "chat_message" and frame["sender_id"] == sender_id:
+            return frame
+
+
+async def _exchange(base_url: str, user_ids: list[uuid.UUID]) -> None:
+    async def open_socket(user_id):
+        token = create_access_token(data={"sub": str(user_id)})
+        return await websockets.connect(
+            f"{base_url}/chat/ws/{user_id}?token={token}",
+            open_timeout=30,
+            ping_interval=None,
+            proxy=None,
+        )
+
+    sockets = await asyncio.gather(*(open_socket(user_id) for user_id in user_ids))
+    try:
+        # Let every connection register before anyone sends.
+        await asyncio.sleep(0.5)
+        pairs = [(index, index ^ 1) for index in range(len(user_ids))]
+        await asyncio.gather(*(
+            sockets[me].send(json.dumps({
+                "receiver_id": str(user_ids[partner]),
+                "content": f"hello from {me}",
+            }))
+            for me, partner in pairs
+        ))
+        async with asyncio.timeout(60):
+            received = await asyncio.gather(*(
+                _receive_chat_message(sockets[me], str(user_ids[partner]))
+                for me, partner in pairs
+            ))
+        for (me, partner), frame in zip(pairs, received):
+            assert frame["receiver_id"] == str(user_ids[me])
+            assert frame["content"] == f"hello from {partner}"
+    finally:
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+
+
+def test_hundreds_of_sockets_share_a_two_connection_pool(users, server_url):
+    asyncio.run(_exchange(server_url, users))
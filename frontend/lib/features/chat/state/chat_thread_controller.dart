@@ -124,6 +124,13 @@ class ChatThreadController extends StateNotifier<ChatThreadState> {
     }
 
     if (type == 'read_receipt') {
+      final msgIds = event['message_ids'];
+      if (msgIds is List) {
+        for (final msgId in msgIds) {
+          _markReadById(msgId.toString());
+        }
+        return;
+      }
       final msgId = event['message_id']?.toString();
       if (msgId == null) return;
       _markReadById(msgId);